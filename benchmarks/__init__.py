@@ -0,0 +1,4 @@
+"""Benchmarks del bot de cauciones (corren offline, sin token real)."""
+import os
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark:offline")
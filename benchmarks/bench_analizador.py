@@ -0,0 +1,60 @@
+"""Análisis de un snapshot para muchos umbrales distintos.
+
+Compara analizar() llamado una vez por tasa objetivo (como hacía el despacho
+de alertas) con analizar_lote(), que ordena el snapshot una sola vez. Verifica
+que ambos caminos den los mismos resultados antes de medir.
+
+Uso: python -m benchmarks.bench_analizador [--umbrales 10000] [--repeticiones 5]
+"""
+import argparse
+import random
+import timeit
+from typing import List
+
+from cauciones_bot.models import DatosCaucion
+from cauciones_bot.services.analytics import AnalizadorMercado
+
+# Filas por snapshot: la página de IOL (~40) y varias fuentes unidas.
+FILAS = (40, 200)
+
+
+def snapshot(filas: int, rng: random.Random) -> List[DatosCaucion]:
+    return [
+        DatosCaucion(rng.randint(1, 120), round(rng.uniform(20, 40), 2)) for _ in range(filas)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--umbrales", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    umbrales = list({round(rng.uniform(15, 45), 4) for _ in range(args.umbrales * 2)})
+    umbrales = umbrales[: args.umbrales]
+
+    print(f"{'filas':>6} {'umbrales':>9} {'por llamada ms':>15} {'lote ms':>9} {'speedup':>8}")
+    for filas in FILAS:
+        datos = snapshot(filas, rng)
+        lote = AnalizadorMercado.analizar_lote(datos, umbrales)
+        for tasa in umbrales:
+            assert lote[tasa] == AnalizadorMercado.analizar(datos, tasa)
+
+        def por_llamada() -> None:
+            for tasa in umbrales:
+                AnalizadorMercado.analizar(datos, tasa)
+
+        def en_lote() -> None:
+            AnalizadorMercado.analizar_lote(datos, umbrales)
+
+        t_llamada = min(timeit.repeat(por_llamada, number=1, repeat=args.repeticiones))
+        t_lote = min(timeit.repeat(en_lote, number=1, repeat=args.repeticiones))
+        print(
+            f"{filas:>6} {len(umbrales):>9} {t_llamada * 1e3:>15.2f} {t_lote * 1e3:>9.2f} "
+            f"{t_llamada / t_lote:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Tiempo de arranque en frío del bot.
+
+Mide, en un intérprete nuevo por corrida, el import de cauciones_bot.app y el
+tiempo hasta quedar listo para el primer poll (build_application, carga de la
+persistencia con N usuarios y restauración de suscripciones). También compara
+cuándo recibe su primera alerta el último usuario restaurado.
+
+Uso: python -m benchmarks.bench_arranque [--usuarios 10000] [--repeticiones 5]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import ConfiguracionUsuario
+from cauciones_bot.services.alertas import DespachadorAlertas
+from cauciones_bot.services.analytics import AnalizadorMercado
+from cauciones_bot.services.persistencia import PersistenciaSQLite
+
+RAIZ = Path(__file__).resolve().parent.parent
+MODULOS_PESADOS = ("matplotlib", "pandas", "lxml")
+
+SCRIPT_IMPORT = """
+import sys, time
+t = time.perf_counter()
+import cauciones_bot.app
+print(time.perf_counter() - t)
+print(",".join(m for m in {pesados!r} if m in sys.modules) or "-")
+"""
+
+SCRIPT_PRIMER_POLL = """
+import asyncio, time
+t = time.perf_counter()
+from cauciones_bot.app import build_application
+from cauciones_bot.services.alertas import DespachadorAlertas
+from cauciones_bot.services.analytics import AnalizadorMercado
+
+async def preparar():
+    app = build_application()
+    user_data = await app.persistence.get_user_data()
+    configs = {k: v["config"] for k, v in user_data.items() if "config" in v}
+    DespachadorAlertas(AnalizadorMercado()).restaurar(configs)
+
+asyncio.run(preparar())
+print(time.perf_counter() - t)
+"""
+
+
+def correr(script: str, cwd: str) -> str:
+    env = dict(os.environ, PYTHONPATH=str(RAIZ))
+    resultado = subprocess.run(
+        [sys.executable, "-c", script], cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr)
+    return resultado.stdout
+
+
+def sembrar_usuarios(directorio: str, usuarios: int) -> None:
+    persistencia = PersistenciaSQLite(str(Path(directorio) / Config.PERSISTENCE_DB_FILE))
+    persistencia.importar(
+        {chat_id: {"config": ConfiguracionUsuario()} for chat_id in range(1, usuarios + 1)}
+    )
+    asyncio.run(persistencia.flush())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        sembrar_usuarios(directorio, args.usuarios)
+
+        tiempos_import, cargados = [], "-"
+        for _ in range(args.repeticiones):
+            segundos, cargados = correr(
+                SCRIPT_IMPORT.format(pesados=MODULOS_PESADOS), directorio
+            ).split()
+            tiempos_import.append(float(segundos))
+        tiempos_poll = [
+            float(correr(SCRIPT_PRIMER_POLL, directorio))
+            for _ in range(args.repeticiones)
+        ]
+
+    print(f"import cauciones_bot.app   {min(tiempos_import) * 1e3:>9.1f} ms")
+    print(f"módulos pesados cargados   {cargados:>9}")
+    print(f"listo para el primer poll  {min(tiempos_poll) * 1e3:>9.1f} ms "
+          f"({args.usuarios} usuarios)")
+
+    configs = {chat_id: ConfiguracionUsuario() for chat_id in range(args.usuarios)}
+    despachador = DespachadorAlertas(AnalizadorMercado())
+    despachador.restaurar(configs, ahora=0.0)
+    intervalo = Config.DEFAULT_INTERVALO_MINUTOS * 60
+    ultima = max(s.ultimo_envio for s in despachador._suscripciones.values()) + intervalo
+    lineal = 10 + (args.usuarios - 1) * 2
+    print(f"\nprimera alerta del último usuario: escalonado {ultima / 60:.1f} min, "
+          f"lineal (10 + 2·n s) {lineal / 3600:.1f} h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Prueba de carga offline: IOL local y Telegram falso.
+
+Sirve la página de cauciones grabada desde un servidor HTTP local (las tasas
+cambian en cada ronda), reemplaza la Bot API por un bot en proceso y lleva N
+usuarios simulados por /start, /ahora, /tendencia, /mitendencia y las alertas
+de la recolección global. Reporta tiempos por componente (scrape, parse,
+analizar, render, envío), latencia p50/p99 por handler y memoria.
+
+Uso: python -m benchmarks.bench_carga [--usuarios 500] [--rondas 5]
+                                      [--concurrencia 50] [--tracemalloc]
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.handlers import MSG_OCUPADO, BotHandlers
+from cauciones_bot.models import DatosCaucion
+from cauciones_bot.services.alertas import DespachadorAlertas
+from cauciones_bot.services.almacen import AlmacenHistorial
+from cauciones_bot.services.analytics import AnalizadorMercado
+from cauciones_bot.services.cache import CacheService
+from cauciones_bot.services.calendario import CalendarioMercado, PlanificadorRecoleccion
+from cauciones_bot.services.cauciones import ServicioCauciones
+from cauciones_bot.services.envios import ColaEnvios
+from cauciones_bot.services.formatter import FormateadorMensajes
+from cauciones_bot.services.history import HistorialService
+from cauciones_bot.services.logger import TelegramLogger
+from cauciones_bot.services.render import ServicioGraficos
+from cauciones_bot.services.scraper import ScraperIOLWeb
+
+FIXTURE = Path(__file__).parent / "fixtures" / "iol_cauciones.html"
+CELDA_VARIABLE = "<td>27,52%</td>"
+COMANDOS = {"ahora": 0.6, "tendencia": 0.2, "mitendencia": 0.2}
+
+
+class ServidorIOL:
+    """Sirve el fixture en localhost; avanzar() cambia una tasa para forzar un snapshot nuevo."""
+
+    def __init__(self) -> None:
+        self._html = FIXTURE.read_text(encoding="utf-8")
+        self.ronda = 0
+        self.pedidos = 0
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                servidor.pedidos += 1
+                cuerpo = servidor.pagina().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}/cauciones"
+
+    def pagina(self) -> str:
+        tasa = f"{27.52 + self.ronda * 0.25:.2f}".replace(".", ",")
+        return self._html.replace(CELDA_VARIABLE, f"<td>{tasa}%</td>", 1)
+
+    def avanzar(self) -> None:
+        self.ronda += 1
+
+    def cerrar(self) -> None:
+        self._http.shutdown()
+
+
+class BotFalso:
+    def __init__(self) -> None:
+        self.enviados = 0
+
+    async def send_message(self, chat_id: int, text: str, parse_mode=None) -> None:
+        await asyncio.sleep(0)
+        self.enviados += 1
+
+
+class MensajeFalso:
+    def __init__(self) -> None:
+        self.respuestas: List[str] = []
+
+    async def reply_text(self, text: str, **kwargs) -> None:
+        self.respuestas.append(text)
+
+    async def reply_photo(self, photo, caption: str = "", **kwargs) -> SimpleNamespace:
+        self.respuestas.append(caption)
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"foto-{id(photo)}")])
+
+
+class JobQueueFalsa:
+    def run_once(self, *args, **kwargs) -> None:
+        pass
+
+
+class Cronometro:
+    def __init__(self) -> None:
+        self.muestras: Dict[str, List[float]] = defaultdict(list)
+
+    def envolver(self, objeto, atributo: str, nombre: str) -> None:
+        setattr(objeto, atributo, self.medir(getattr(objeto, atributo), nombre))
+
+    def medir(self, original: Callable, nombre: str) -> Callable:
+        muestras = self.muestras[nombre]
+
+        if asyncio.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    muestras.append(time.perf_counter() - inicio)
+        else:
+            @functools.wraps(original)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    muestras.append(time.perf_counter() - inicio)
+
+        return envoltura
+
+    def reportar(self, titulo: str) -> None:
+        print(f"\n{titulo:<24} {'n':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for nombre, muestras in self.muestras.items():
+            if not muestras:
+                continue
+            ms = np.asarray(muestras) * 1e3
+            p50, p99 = np.percentile(ms, [50, 99])
+            print(f"{nombre:<24} {len(ms):>6} {p50:>9.2f} {p99:>9.2f} {ms.max():>9.2f}")
+
+
+def precargar_historial(historial: HistorialService, dias: int) -> None:
+    rng = np.random.default_rng(0)
+    inicio = datetime.now() - timedelta(days=dias)
+    for i in range(dias * 288):
+        tasas = 28 + rng.normal(size=3)
+        historial.agregar_punto(
+            [DatosCaucion(1, tasas[0]), DatosCaucion(7, tasas[1]), DatosCaucion(30, tasas[2])],
+            inicio + timedelta(minutes=5 * i),
+        )
+
+
+def crear_update(chat_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_user=SimpleNamespace(first_name=f"usuario{chat_id}"),
+        message=MensajeFalso(),
+    )
+
+
+async def correr(args: argparse.Namespace, directorio: str) -> None:
+    servidor = ServidorIOL()
+    componentes, handlers_t = Cronometro(), Cronometro()
+
+    historial = HistorialService(almacen=AlmacenHistorial(str(Path(directorio) / "h.sqlite3")))
+    precargar_historial(historial, args.dias_historial)
+    scraper = ScraperIOLWeb(servidor.url, TelegramLogger())
+    analizador = AnalizadorMercado()
+    servicio = ServicioCauciones(scraper, CacheService(), historial, analizador, TelegramLogger())
+    despachador = DespachadorAlertas(analizador)
+    # Sin rate limit: se mide el costo propio del bot, no el de la Bot API.
+    cola = ColaEnvios(despachador.desuscribir, tasa_global=1e9, tasa_por_chat=1e9)
+    graficos = ServicioGraficos()
+    historial.suscribir_cambios(graficos.invalidar)
+    handlers = BotHandlers(
+        servicio, FormateadorMensajes(), despachador, cola,
+        PlanificadorRecoleccion(CalendarioMercado()), graficos,
+    )
+    bot = BotFalso()
+
+    componentes.envolver(scraper, "obtener_snapshot", "scrape")
+    componentes.envolver(scraper, "_parsear_html", "parse")
+    componentes.envolver(analizador, "analizar", "analizar")
+    componentes.envolver(graficos, "renderizar", "render")
+    componentes.envolver(bot, "send_message", "envío (bot)")
+    componentes.envolver(handlers, "recoleccion_global", "recolección global")
+    handler_por_comando = {
+        "start": handlers.cmd_start,
+        "ahora": handlers.cmd_ahora,
+        "tendencia": handlers.cmd_tendencia_general,
+        "mitendencia": handlers.cmd_tendencia_custom,
+    }
+    for comando, handler in handler_por_comando.items():
+        handler_por_comando[comando] = handlers_t.medir(handler, f"/{comando}")
+
+    cola.iniciar(bot)
+    rng = random.Random(0)
+    usuarios = {chat_id: {} for chat_id in range(1, args.usuarios + 1)}
+    contexto_global = SimpleNamespace(job_queue=JobQueueFalsa())
+    semaforo = asyncio.Semaphore(args.concurrencia)
+    rechazados = 0
+
+    async def ejecutar(comando: str, chat_id: int, argumentos: List[str]) -> None:
+        nonlocal rechazados
+        async with semaforo:
+            update = crear_update(chat_id)
+            contexto = SimpleNamespace(user_data=usuarios[chat_id], args=argumentos)
+            await handler_por_comando[comando](update, contexto)
+            rechazados += MSG_OCUPADO in update.message.respuestas
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(ejecutar("start", chat_id, []) for chat_id in usuarios))
+    for chat_id, user_data in usuarios.items():
+        user_data["config"].tna_objetivo = rng.uniform(20, 35)
+        user_data["config"].dias_grafico_custom = rng.choice((1, 7, 30))
+
+    for _ in range(args.rondas):
+        servidor.avanzar()
+        await handlers.recoleccion_global(contexto_global)
+        pedidos = []
+        for chat_id in usuarios:
+            comando = rng.choices(list(COMANDOS), weights=list(COMANDOS.values()))[0]
+            argumentos = [str(rng.choice((1, 3, 30)))] if comando == "mitendencia" else []
+            pedidos.append(ejecutar(comando, chat_id, argumentos))
+        await asyncio.gather(*pedidos)
+
+    while cola.metricas()["profundidad"]:
+        await asyncio.sleep(0.01)
+    total = time.perf_counter() - inicio
+
+    metricas = cola.metricas()
+    await cola.detener()
+    await servicio.cerrar()
+    graficos.cerrar()
+    servidor.cerrar()
+
+    comandos = sum(len(m) for m in handlers_t.muestras.values())
+    print(f"{args.usuarios} usuarios, {args.rondas} rondas: {comandos} comandos en {total:.2f} s "
+          f"({comandos / total:.0f} cmd/s), {servidor.pedidos} pedidos a IOL, "
+          f"{rechazados} gráficos rechazados por saturación")
+    print(f"alertas enviadas: {metricas['enviados']} "
+          f"(latencia cola media {metricas['latencia_media_s'] * 1e3:.1f} ms, "
+          f"max {metricas['latencia_max_s'] * 1e3:.1f} ms)")
+    componentes.reportar("componente")
+    handlers_t.reportar("handler")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--rondas", type=int, default=5)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--dias-historial", type=int, default=3)
+    parser.add_argument("--tracemalloc", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.tracemalloc:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directorio:
+        asyncio.run(correr(args, directorio))
+
+    # Los renders corren en el pool (spawn), fuera de este proceso. Sus workers
+    # ya terminaron al cerrar el servicio: RUSAGE_CHILDREN da el pico del mayor.
+    rss_bot = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    rss_render = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"\nRSS máximo: bot {rss_bot:.1f} MB, worker de render {rss_render:.1f} MB")
+    print(f"  (hasta {Config.RENDER_WORKERS} workers de render en paralelo)")
+    if args.tracemalloc:
+        actual, pico = tracemalloc.get_traced_memory()
+        print(f"tracemalloc: actual {actual / 2**20:.1f} MB, pico {pico / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
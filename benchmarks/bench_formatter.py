@@ -0,0 +1,114 @@
+"""Formateo de alertas para N suscriptores de un mismo snapshot.
+
+Compara el formateador original (un string por usuario armado con +=) con el
+memorizado por (versión, tasa objetivo, tipo de reporte), con umbrales
+concentrados en el default como en producción.
+
+Uso: python -m benchmarks.bench_formatter [--repeticiones 5]
+"""
+import argparse
+import random
+import timeit
+from typing import List
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion, ResultadoAnalisis
+from cauciones_bot.services.analytics import AnalizadorMercado
+from cauciones_bot.services.formatter import FormateadorMensajes
+
+ESCALAS = (100, 1_000, 10_000)
+
+
+def reporte_completo_original(analisis: ResultadoAnalisis, tasa_objetivo: float) -> str:
+    mensajes = []
+    if analisis.hay_alerta_critica:
+        mensajes.append(f"🚨🚨 *SUPER ALERTA: {analisis.tasa_maxima}% TNA* 🚨🚨")
+
+    msg_top = "*🏆 Top 3 Mercado (hasta 60 días):*\n\n"
+    for item in analisis.top_3:
+        msg_top += f"✅ *{item.tasa}%* a {item.dias} DÍAS\n"
+    mensajes.append(msg_top)
+
+    if analisis.oportunidades:
+        msg_ops = f"\n🔔 *Tus Oportunidades (> {tasa_objetivo}%):*\n\n"
+        for item in analisis.oportunidades[:5]:
+            msg_ops += f"✅ *{item.dias} DÍAS* | Tasa: {item.tasa}%\n"
+        mensajes.append(msg_ops)
+
+    return "\n".join(mensajes)
+
+
+def reporte_manual_original(analisis: ResultadoAnalisis, tasa_objetivo: float) -> str:
+    msg = (
+        f"🔎 *REPORTE MANUAL* (Obj: {tasa_objetivo}%)\n\n"
+        "*🏆 Top 3 Global:*\n\n"
+    )
+    for item in analisis.top_3:
+        msg += f"• {item.tasa}% ({item.dias} DÍAS)\n"
+
+    msg += "\n*✅ Oportunidades:*\n\n"
+
+    if analisis.oportunidades:
+        for item in analisis.oportunidades[:5]:
+            msg += f"• {item.tasa}% ({item.dias} DÍAS)\n"
+    else:
+        msg += "Nada supera tu objetivo hoy."
+
+    return msg
+
+
+def umbrales(usuarios: int, rng: random.Random) -> List[float]:
+    # ~70% en el default, el resto en enteros "redondos" como los que se tipean.
+    return [
+        Config.DEFAULT_TNA_OBJETIVO if rng.random() < 0.7 else float(rng.randint(20, 40))
+        for _ in range(usuarios)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    datos = [DatosCaucion(dias, round(rng.uniform(20, 40), 2)) for dias in range(1, 61)]
+    analisis = {}
+
+    print(f"{'usuarios':>9} {'original ms':>12} {'memo ms':>9} {'speedup':>8}")
+    for usuarios in ESCALAS:
+        tasas = umbrales(usuarios, rng)
+        for tasa in set(tasas):
+            analisis.setdefault(tasa, AnalizadorMercado.analizar(datos, tasa))
+
+        for tasa in set(tasas):
+            formateador = FormateadorMensajes()
+            res = analisis[tasa]
+            assert formateador.formatear_reporte_completo(res, tasa, 1) == (
+                reporte_completo_original(res, tasa)
+            )
+            assert formateador.formatear_reporte_manual(res, tasa, 1) == (
+                reporte_manual_original(res, tasa)
+            )
+
+        def original() -> None:
+            for tasa in tasas:
+                reporte_completo_original(analisis[tasa], tasa)
+
+        version = iter(range(10**9))
+
+        def memorizado() -> None:
+            # Versión nueva en cada corrida: se mide un snapshot completo, memo en frío.
+            formateador, v = FormateadorMensajes(), next(version)
+            for tasa in tasas:
+                formateador.formatear_reporte_completo(analisis[tasa], tasa, v)
+
+        t_original = min(timeit.repeat(original, number=1, repeat=args.repeticiones))
+        t_memo = min(timeit.repeat(memorizado, number=1, repeat=args.repeticiones))
+        print(
+            f"{usuarios:>9} {t_original * 1e3:>12.2f} {t_memo * 1e3:>9.2f} "
+            f"{t_original / t_memo:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Parsers de la tabla de cauciones de IOL a distintas escalas.
+
+Compara el parser por filas (iterrows) con el vectorizado sobre el DataFrame,
+y la página completa con pd.read_html vs el extractor lxml.
+
+Uso: python -m benchmarks.bench_parser [--repeticiones 20]
+"""
+import argparse
+import timeit
+from io import StringIO
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+from cauciones_bot.models import DatosCaucion
+from cauciones_bot.services.parsers import ParserLxml, ParserPandas
+
+FIXTURE = Path(__file__).parent / "fixtures" / "iol_cauciones.html"
+ESCALAS = (1, 10, 100)
+
+
+def parsear_por_filas(df: pd.DataFrame) -> List[DatosCaucion]:
+    col_tasa, col_plazo = "tasa tomadora", "plazo"
+    resultados: List[DatosCaucion] = []
+    for _, row in df.iterrows():
+        try:
+            raw_tasa = str(row[col_tasa])
+            tasa = float(raw_tasa.replace("%", "").replace(".", "").replace(",", ".").strip())
+            raw_plazo = (
+                str(row[col_plazo])
+                .lower()
+                .replace("días", "")
+                .replace("dias", "")
+                .replace("d", "")
+                .strip()
+            )
+            dias = int(float(raw_plazo))
+            resultados.append(DatosCaucion(dias=dias, tasa=tasa, raw_tasa=raw_tasa))
+        except Exception:
+            continue
+    return resultados
+
+
+def cargar_tabla() -> pd.DataFrame:
+    df = pd.read_html(StringIO(FIXTURE.read_text(encoding="utf-8")))[0]
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def escalar_html(html: str, escala: int) -> str:
+    inicio = html.index("<tbody>") + len("<tbody>")
+    fin = html.index("</tbody>")
+    return html[:inicio] + html[inicio:fin] * escala + html[fin:]
+
+
+def medir(funcion, repeticiones: int) -> float:
+    return min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    base = cargar_tabla()
+    print(f"{'escala':>7} {'filas':>7} {'iterrows ms':>12} {'vectorial ms':>13} {'speedup':>8}")
+    for escala in ESCALAS:
+        df = pd.concat([base] * escala, ignore_index=True)
+
+        esperado = [(d.dias, d.tasa) for d in parsear_por_filas(df)]
+        obtenido = [(d.dias, d.tasa) for d in ParserPandas.parsear_dataframe(df).a_datos()]
+        assert esperado == obtenido, "los parsers no coinciden"
+
+        t_filas = min(
+            timeit.repeat(lambda: parsear_por_filas(df), number=1, repeat=args.repeticiones)
+        )
+        t_vector = min(
+            timeit.repeat(
+                lambda: ParserPandas.parsear_dataframe(df),
+                number=1,
+                repeat=args.repeticiones,
+            )
+        )
+        print(
+            f"{escala:>6}x {len(df):>7} {t_filas * 1e3:>12.2f} "
+            f"{t_vector * 1e3:>13.2f} {t_filas / t_vector:>7.1f}x"
+        )
+
+    html = FIXTURE.read_text(encoding="utf-8")
+    print(f"\n{'escala':>7} {'read_html ms':>13} {'lxml ms':>8} {'speedup':>8}")
+    for escala in ESCALAS:
+        pagina = escalar_html(html, escala)
+        assert len(ParserLxml().parsear(pagina)) == len(ParserPandas().parsear(pagina))
+
+        t_pandas = medir(lambda: ParserPandas().parsear(pagina), args.repeticiones)
+        t_lxml = medir(lambda: ParserLxml().parsear(pagina), args.repeticiones)
+        print(
+            f"{escala:>6}x {t_pandas * 1e3:>13.2f} {t_lxml * 1e3:>8.2f} "
+            f"{t_pandas / t_lxml:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
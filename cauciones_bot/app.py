@@ -1,29 +1,80 @@
 import logging
 
 from telegram import BotCommand
-from telegram.ext import Application, ApplicationBuilder, CommandHandler, PicklePersistence
+from telegram.ext import Application, ApplicationBuilder, CommandHandler
 
 from cauciones_bot.config import Config
 from cauciones_bot.handlers import BotHandlers
+from cauciones_bot.services.alertas import DespachadorAlertas
+from cauciones_bot.services.almacen import AlmacenHistorial
 from cauciones_bot.services.analytics import AnalizadorMercado
 from cauciones_bot.services.cache import CacheService
-from cauciones_bot.services.cauciones import ServicioCauciones
+from cauciones_bot.services.calendario import CalendarioMercado, PlanificadorRecoleccion
+from cauciones_bot.services.cauciones import ServicioCauciones, ServicioCaucionesCompartido
+from cauciones_bot.services.compartido import LectorSnapshot
+from cauciones_bot.services.envios import ColaEnvios
 from cauciones_bot.services.formatter import FormateadorMensajes
+from cauciones_bot.services.fuentes import crear_scraper
 from cauciones_bot.services.history import HistorialService
 from cauciones_bot.services.logger import TelegramLogger
-from cauciones_bot.services.scraper import ScraperIOLWeb
+from cauciones_bot.services.metricas import ServidorMetricas, metricas
+from cauciones_bot.services.persistencia import PersistenciaSQLite
+from cauciones_bot.services.render import ServicioGraficos
 
 
 def build_application() -> Application:
     logger = TelegramLogger()
-    cache = CacheService()
-    historial = HistorialService()
-    scraper = ScraperIOLWeb(Config.IOL_URL, logger)
     analizador = AnalizadorMercado()
     formateador = FormateadorMensajes()
 
-    servicio = ServicioCauciones(scraper, cache, historial, analizador, logger)
-    handlers = BotHandlers(servicio, formateador)
+    worker = Config.BOT_MODO == "worker"
+    # Un único proceso evalúa y envía alertas: el monolito o el worker marcado.
+    envia_alertas = not worker or Config.WORKER_ALERTAS
+    persistence = PersistenciaSQLite(
+        Config.PERSISTENCE_DB_FILE,
+        update_interval=(
+            Config.PERSISTENCE_WORKER_UPDATE_SECONDS
+            if worker
+            else Config.PERSISTENCE_UPDATE_SECONDS
+        ),
+        compartida=worker,
+    )
+
+    if worker:
+        # El historial lo escribe el colector: acá solo se lee.
+        historial = HistorialService(ruta_colector=Config.HISTORY_DB_FILE)
+        servicio = ServicioCaucionesCompartido(LectorSnapshot(), historial, analizador)
+    else:
+        historial = HistorialService(almacen=AlmacenHistorial(Config.HISTORY_DB_FILE))
+        scraper = crear_scraper(logger)
+        servicio = ServicioCauciones(scraper, CacheService(), historial, analizador, logger)
+    despachador = DespachadorAlertas(analizador)
+
+    def al_bloquear(chat_id: int) -> None:
+        despachador.desuscribir(chat_id)
+        # Se borra también de la persistencia: si no, restaurar_tareas lo
+        # volvería a suscribir tras cada reinicio.
+        app.drop_user_data(chat_id)
+
+    cola = ColaEnvios(al_bloquear=al_bloquear)
+    planificador = PlanificadorRecoleccion(CalendarioMercado())
+    graficos = ServicioGraficos()
+    historial.suscribir_cambios(graficos.invalidar)
+    handlers = BotHandlers(
+        servicio,
+        formateador,
+        despachador,
+        cola,
+        planificador,
+        graficos,
+        persistencia=persistence if worker and envia_alertas else None,
+    )
+    servidor_metricas = ServidorMetricas()
+    metricas.registrar_gauge("historial_puntos", lambda: len(historial))
+    metricas.registrar_gauge("suscriptores", lambda: len(despachador))
+    metricas.registrar_gauge("graficos_pendientes", lambda: graficos.pendientes)
+    for clave in ("profundidad", "enviados", "fallidos", "reintentos", "bloqueados"):
+        metricas.registrar_gauge(f"envios_{clave}", lambda c=clave: cola.metricas()[c])
 
     async def post_init(application: Application) -> None:
         comandos = [
@@ -33,40 +84,63 @@ def build_application() -> Application:
             BotCommand("mitendencia", "Grafico Custom"),
             BotCommand("set", "Set Alerta"),
             BotCommand("set_tendencia", "Set Dias Grafico"),
+            BotCommand("set_sigma", "Set Alerta Saltos"),
             BotCommand("stop", "Parar"),
         ]
         await application.bot.set_my_commands(comandos)
-        await handlers.restaurar_tareas(application)
+        if envia_alertas:
+            await handlers.restaurar_tareas(application)
+            cola.iniciar(application.bot)
+        await servidor_metricas.iniciar()
+
+    async def post_shutdown(application: Application) -> None:
+        await servidor_metricas.detener()
+        await cola.detener()
+        await servicio.cerrar()
+        graficos.cerrar()
 
-    persistence = PicklePersistence(filepath=Config.PERSISTENCE_FILE)
     app = (
         ApplicationBuilder()
         .token(Config.TELEGRAM_TOKEN)
         .persistence(persistence)
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
     app.add_handler(CommandHandler("start", handlers.cmd_start))
     app.add_handler(CommandHandler("set", handlers.cmd_set_tna))
+    app.add_handler(CommandHandler("set_sigma", handlers.cmd_set_sigma))
     app.add_handler(CommandHandler("tiempo", handlers.cmd_set_tiempo))
     app.add_handler(CommandHandler("ahora", handlers.cmd_ahora))
     app.add_handler(CommandHandler("stop", handlers.cmd_stop))
     app.add_handler(CommandHandler("tendencia", handlers.cmd_tendencia_general))
     app.add_handler(CommandHandler("set_tendencia", handlers.cmd_set_tendencia))
     app.add_handler(CommandHandler("mitendencia", handlers.cmd_tendencia_custom))
+    app.add_handler(CommandHandler("stats", handlers.cmd_stats))
 
-    app.job_queue.run_repeating(
-        handlers.recoleccion_global,
-        interval=Config.HISTORY_MIN_INTERVAL_SECONDS,
-        first=10,
-        name="global_scraper",
-    )
+    if envia_alertas:
+        handlers.programar_recoleccion(app.job_queue, espera=10)
 
     logging.info("🤖 Bot V2.1 Iniciado (Hora Fix)")
     return app
 
 
 def main() -> None:
+    if Config.BOT_MODO == "colector":
+        from cauciones_bot.colector import main as main_colector
+
+        main_colector()
+        return
+
     app = build_application()
-    app.run_polling()
+    if Config.WEBHOOK_URL:
+        app.run_webhook(
+            listen=Config.WEBHOOK_HOST,
+            port=Config.WEBHOOK_PUERTO,
+            url_path="telegram",
+            webhook_url=f"{Config.WEBHOOK_URL.rstrip('/')}/telegram",
+            secret_token=Config.WEBHOOK_SECRETO or None,
+        )
+    else:
+        app.run_polling()
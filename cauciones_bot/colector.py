@@ -0,0 +1,60 @@
+"""Proceso colector: scrapea las fuentes, escribe el historial y publica el snapshot.
+
+Los workers del bot (BOT_MODO=worker) leen el snapshot de memoria compartida
+y el historial de la misma base SQLite, sin scrapear por su cuenta.
+
+Uso: BOT_MODO=colector python main.py   (o python -m cauciones_bot.colector)
+"""
+import asyncio
+import logging
+
+from cauciones_bot.config import Config
+from cauciones_bot.services.almacen import AlmacenHistorial
+from cauciones_bot.services.analytics import AnalizadorMercado
+from cauciones_bot.services.cache import CacheService
+from cauciones_bot.services.calendario import CalendarioMercado, PlanificadorRecoleccion
+from cauciones_bot.services.cauciones import ServicioCauciones
+from cauciones_bot.services.compartido import PublicadorSnapshot
+from cauciones_bot.services.fuentes import crear_scraper
+from cauciones_bot.services.history import HistorialService
+from cauciones_bot.services.logger import TelegramLogger
+from cauciones_bot.services.metricas import ServidorMetricas, metricas
+
+
+async def ejecutar() -> None:
+    logger = TelegramLogger()
+    historial = HistorialService(almacen=AlmacenHistorial(Config.HISTORY_DB_FILE))
+    scraper = crear_scraper(logger)
+    servicio = ServicioCauciones(scraper, CacheService(), historial, AnalizadorMercado(), logger)
+    planificador = PlanificadorRecoleccion(CalendarioMercado())
+    publicador = PublicadorSnapshot()
+    servidor_metricas = ServidorMetricas()
+    metricas.registrar_gauge("historial_puntos", lambda: len(historial))
+
+    await servidor_metricas.iniciar()
+    logging.info("🛰️ Colector iniciado, publicando en %s.", Config.SNAPSHOT_SHM_NOMBRE)
+    try:
+        while True:
+            with metricas.cronometro("recoleccion"):
+                datos = await servicio.actualizar_snapshot()
+                if datos:
+                    # Se republica aunque no haya cambios: el timestamp es el latido.
+                    publicador.publicar(datos, servicio.version, servicio.version_historial)
+                    if servicio.snapshot_cambio:
+                        planificador.registrar_snapshot(datos)
+            await asyncio.sleep(planificador.proximo_intervalo())
+    finally:
+        await servidor_metricas.detener()
+        await servicio.cerrar()
+        publicador.cerrar()
+
+
+def main() -> None:
+    try:
+        asyncio.run(ejecutar())
+    except KeyboardInterrupt:
+        logging.info("🛑 Colector detenido.")
+
+
+if __name__ == "__main__":
+    main()
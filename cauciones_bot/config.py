@@ -5,19 +5,130 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _fuentes_extra(valor: str) -> tuple:
+    fuentes = []
+    for fuente in valor.split(";"):
+        if not fuente.strip():
+            continue
+        campos = tuple(campo.strip() for campo in fuente.split("|"))
+        if len(campos) != 3 or not all(campos):
+            raise ValueError(
+                f"❌ ERROR: Fuente inválida en FUENTES_EXTRA: {fuente!r} (nombre|moneda|url)"
+            )
+        fuentes.append(campos)
+    return tuple(fuentes)
+
+
 class Config:
     TELEGRAM_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN")
     if not TELEGRAM_TOKEN:
         raise ValueError("❌ ERROR: No se encontró el token en el archivo .env")
 
     IOL_URL: str = "https://iol.invertironline.com/mercado/cotizaciones/argentina/cauciones"
+    # Historial, alertas y gráficos usan solo las cauciones en esta moneda.
+    MONEDA_PRINCIPAL: str = "ARS"
+    # (nombre, moneda, url). Más fuentes con FUENTES_EXTRA="nombre|moneda|url;..."
+    FUENTES: tuple = (("iol", MONEDA_PRINCIPAL, IOL_URL),) + _fuentes_extra(
+        os.getenv("FUENTES_EXTRA", "")
+    )
+    if len({nombre for nombre, _, _ in FUENTES}) != len(FUENTES):
+        raise ValueError("❌ ERROR: Nombres de fuente repetidos en FUENTES_EXTRA")
+    FUENTES_TIMEOUT_SECONDS: float = 10.0
+    # Una fuente caída sigue aportando su última porción buena hasta esta edad.
+    FUENTES_MAX_EDAD_SECONDS: int = 300
+    SCRAPER_TIMEOUT_SECONDS: float = 10.0
+    SCRAPER_MAX_CONCURRENCIA: int = 2
+    SCRAPER_KEEPALIVE_SECONDS: float = 120.0
+    SCRAPER_PARSER: str = "lxml"
+    SCRAPER_PARSER_RESPALDO: str = "pandas"
     CACHE_TTL_SECONDS: int = 60
+    CACHE_STALE_SECONDS: int = 120
+    CACHE_BACKOFF_SECONDS: float = 15.0
+    CACHE_BACKOFF_MAX_SECONDS: float = 300.0
+    CACHE_GRAFICOS_MAX_BYTES: int = 16 * 1024 * 1024
+    CACHE_GRAFICOS_MAX_ENTRADAS: int = 256
     MAX_HISTORY_POINTS: int = 288
     HISTORY_MIN_INTERVAL_SECONDS: int = 300
+    HISTORY_DB_FILE: str = "bot_historial.sqlite3"
+    HISTORY_RETENTION_DAYS: int = 90
+    HISTORY_PURGE_EVERY: int = 288
+    HISTORY_MAX_PLAZO: int = 365
+    # Filas por lote al exportar/importar historial en Arrow IPC o Parquet.
+    VOLCADO_LOTE_FILAS: int = 100_000
+    ROLLUPS_RESOLUCIONES: tuple = (3600, 86400)
+    ROLLUPS_RETENTION_DAYS: int = 730
+    ROLLUPS_BLOQUE_DIAS: int = 7
+    # Argentina no tiene horario de verano: los buckets diarios cortan a las 00:00 ART.
+    TZ_OFFSET_SECONDS: int = -3 * 3600
+    GRAFICO_MIN_PUNTOS: int = 48
+    # (nombre, plazo mínimo, plazo máximo o None = sin tope)
+    TRAMOS_PLAZO: tuple = (("Corto", 1, 7), ("Medio", 8, 30), ("Largo", 31, None))
+    RECOLECCION_INTERVAL_SECONDS: int = 60
+    RECOLECCION_RAPIDA_SECONDS: int = 20
+    RECOLECCION_MAX_INTERVAL_SECONDS: int = 3600
+    MERCADO_APERTURA: str = os.getenv("MERCADO_APERTURA", "10:30")
+    MERCADO_CIERRE: str = os.getenv("MERCADO_CIERRE", "17:00")
+    MERCADO_PREAPERTURA_SECONDS: int = 300
+    MERCADO_BORDE_SECONDS: int = 900
+    # Feriados nacionales de fecha fija (MM-DD); los móviles van en MERCADO_FERIADOS.
+    MERCADO_FERIADOS_FIJOS: frozenset = frozenset(
+        {"01-01", "03-24", "04-02", "05-01", "05-25", "06-20", "07-09", "12-08", "12-25"}
+    )
+    MERCADO_FERIADOS: frozenset = frozenset(
+        dia.strip() for dia in os.getenv("MERCADO_FERIADOS", "").split(",") if dia.strip()
+    )
+    VOLATILIDAD_UMBRAL_TNA: float = 2.0
+    VOLATILIDAD_VENTANA_SECONDS: int = 900
     DEFAULT_TNA_OBJETIVO: float = 25.0
     DEFAULT_INTERVALO_MINUTOS: int = 5
     DEFAULT_DIAS_GRAFICO: int = 1
     MAX_DIAS_TOP3: int = 60
     MAX_DIAS_OPORTUNIDADES: int = 30
     MIN_DIAS_OPORTUNIDADES: int = 1
+    TASA_ALERTA_CRITICA: float = 100.0
+    # Estadísticas por plazo sobre los puntos del historial (uno cada 5 min):
+    # alpha 0.1 da una memoria efectiva de ~1.5 h.
+    ESTADISTICAS_ALPHA: float = 0.1
+    ESTADISTICAS_MIN_PUNTOS: int = 12
+    # Piso de volatilidad (puntos de TNA): con tasas planas un tick mínimo no es un salto.
+    ESTADISTICAS_MIN_VOLATILIDAD: float = 0.1
+    # Menor sigma que acepta /set_sigma; por debajo no se informan saltos.
+    ESTADISTICAS_SIGMA_MINIMO: float = 2.0
+    # Variación mínima de TNA (puntos) para reenviar una alerta con los mismos plazos.
+    ALERTAS_DELTA_TASA: float = float(os.getenv("ALERTAS_DELTA_TASA", "0.5"))
+    RENDER_WORKERS: int = 2
+    RENDER_MAX_PENDIENTES: int = 8
+    RENDER_TIMEOUT_SECONDS: float = 20.0
+    ENVIOS_WORKERS: int = 4
+    ENVIOS_TASA_GLOBAL: float = 25.0
+    ENVIOS_TASA_POR_CHAT: float = 1.0
+    ENVIOS_MAX_REINTENTOS: int = 3
+    ENVIOS_MAX_BUCKETS_CHAT: int = 5000
     PERSISTENCE_FILE: str = "bot_datos_usuarios_v2.pickle"
+    PERSISTENCE_DB_FILE: str = "bot_datos_usuarios.sqlite3"
+    PERSISTENCE_UPDATE_SECONDS: float = 60.0
+    ADMIN_IDS: frozenset = frozenset(
+        int(uid) for uid in os.getenv("ADMIN_IDS", "").split(",") if uid.strip()
+    )
+    METRICAS_HOST: str = os.getenv("METRICAS_HOST", "127.0.0.1")
+    # 0 desactiva el endpoint. En colector + worker cada proceso necesita su propio
+    # puerto (p. ej. 9108 el colector, 9109.. los workers); si el puerto está
+    # ocupado el proceso arranca igual, sin métricas.
+    METRICAS_PUERTO: int = int(os.getenv("METRICAS_PUERTO", "9108"))
+    # monolito: un proceso hace todo. colector + worker: el colector scrapea y
+    # publica el snapshot en memoria compartida; el worker atiende Telegram.
+    BOT_MODO: str = os.getenv("BOT_MODO", "monolito")
+    # Con varios workers, solo uno evalúa y envía alertas; el resto atiende
+    # comandos y deja los cambios de configuración en la base.
+    WORKER_ALERTAS: bool = os.getenv("WORKER_ALERTAS", "0") == "1"
+    # En modo worker la configuración se escribe casi enseguida: otro worker
+    # puede atender el próximo comando del mismo usuario.
+    PERSISTENCE_WORKER_UPDATE_SECONDS: float = 1.0
+    SNAPSHOT_SHM_NOMBRE: str = os.getenv("SNAPSHOT_SHM_NOMBRE", "cauciones_snapshot")
+    SNAPSHOT_MAX_FILAS: int = 256
+    # El colector republica en cada pasada; más viejo que esto se da por caído.
+    SNAPSHOT_MAX_EDAD_SECONDS: int = 2 * RECOLECCION_MAX_INTERVAL_SECONDS
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+    WEBHOOK_PUERTO: int = int(os.getenv("WEBHOOK_PUERTO", "8443"))
+    WEBHOOK_SECRETO: str = os.getenv("WEBHOOK_SECRETO", "")
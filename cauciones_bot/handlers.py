@@ -1,34 +1,117 @@
 import logging
+import math
+import time
+from typing import List, Optional
 
 from telegram import Update
-from telegram.ext import Application, ContextTypes
+from telegram.ext import Application, ContextTypes, JobQueue
 
-from cauciones_bot.models import ConfiguracionUsuario
+from cauciones_bot.config import Config
+from cauciones_bot.models import ConfiguracionUsuario, DatosCaucion
+from cauciones_bot.services.alertas import DespachadorAlertas
+from cauciones_bot.services.cache import GraficoCacheado
+from cauciones_bot.services.calendario import PlanificadorRecoleccion
 from cauciones_bot.services.cauciones import ServicioCauciones
-from cauciones_bot.services.charts import GeneradorGraficos
+from cauciones_bot.services.envios import ColaEnvios
 from cauciones_bot.services.formatter import FormateadorMensajes
+from cauciones_bot.services.metricas import metricas
+from cauciones_bot.services.persistencia import PersistenciaSQLite
+from cauciones_bot.services.render import ServicioGraficos, ServicioOcupadoError
+
+MSG_OCUPADO = "⏳ Hay muchos gráficos en preparación, probá de nuevo en unos segundos."
 
 
 class BotHandlers:
-    def __init__(self, servicio: ServicioCauciones, formateador: FormateadorMensajes) -> None:
+    def __init__(
+        self,
+        servicio: ServicioCauciones,
+        formateador: FormateadorMensajes,
+        despachador: DespachadorAlertas,
+        cola: ColaEnvios,
+        planificador: PlanificadorRecoleccion,
+        graficos: ServicioGraficos,
+        persistencia: Optional[PersistenciaSQLite] = None,
+    ) -> None:
         self._servicio = servicio
         self._formateador = formateador
+        self._despachador = despachador
+        self._cola = cola
+        self._planificador = planificador
+        self._graficos = graficos
+        # Solo en el worker que envía alertas: ahí se leen los cambios de
+        # configuración que escriben los demás workers.
+        self._persistencia = persistencia
+        self._sincronizado_hasta = int(time.time())
+        self._version_despachada = 0
+        self._recoleccion_programada: Optional[float] = None
 
     async def recoleccion_global(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if self._recoleccion_programada is not None:
+            metricas.fijar("recoleccion_lag_seconds", time.time() - self._recoleccion_programada)
+        inicio = time.perf_counter()
         try:
-            datos = self._servicio.obtener_datos_mercado()
-            if datos:
+            self._sincronizar_suscripciones()
+            datos = await self._servicio.actualizar_snapshot()
+            if datos and not self._servicio.snapshot_cambio:
+                logging.info("⏸️ Global: Sin cambios.")
+            elif datos:
                 logging.info("🔄 Global: %s registros.", len(datos))
             else:
                 logging.info("💤 Global: Sin datos.")
+            version = self._servicio.version
+            if datos and version != self._version_despachada:
+                self._version_despachada = version
+                self._planificador.registrar_snapshot(datos)
+                self._despachar_alertas(datos)
         except Exception as exc:
             logging.error("❌ Error global: %s", exc)
+        finally:
+            metricas.observar("recoleccion", time.perf_counter() - inicio)
+            self.programar_recoleccion(context.job_queue)
+
+    def _sincronizar_suscripciones(self) -> None:
+        if self._persistencia is None:
+            return
+        # `actualizado` tiene resolución de segundos: se relee el último segundo
+        # y sincronizar() ignora lo que no cambió.
+        desde, self._sincronizado_hasta = self._sincronizado_hasta, int(time.time())
+        self._despachador.sincronizar(self._persistencia.cambios_desde(desde - 1))
+
+    def programar_recoleccion(self, job_queue: JobQueue, espera: Optional[float] = None) -> None:
+        if espera is None:
+            espera = self._planificador.proximo_intervalo()
+        if espera > Config.RECOLECCION_INTERVAL_SECONDS:
+            logging.info("🌙 Mercado cerrado: próxima recolección en %.0f min.", espera / 60)
+        self._recoleccion_programada = time.time() + espera
+        job_queue.run_once(self.recoleccion_global, when=espera, name="global_scraper")
+
+    def _despachar_alertas(self, datos: List[DatosCaucion]) -> None:
+        with metricas.cronometro("despacho_alertas"):
+            version = self._servicio.version
+            for alerta in self._despachador.evaluar(datos, saltos=self._servicio.saltos()):
+                suscripcion, res = alerta.suscripcion, alerta.resultado
+                partes = []
+                if res is not None:
+                    partes.append(
+                        self._formateador.formatear_reporte_completo(
+                            res, suscripcion.umbral, version
+                        )
+                    )
+                if alerta.saltos:
+                    partes.append(
+                        self._formateador.formatear_saltos(
+                            alerta.saltos, suscripcion.sigma, version
+                        )
+                    )
+                critica = res is not None and res.hay_alerta_critica
+                self._cola.encolar(suscripcion.chat_id, "\n\n".join(partes), critica=critica)
 
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         chat_id = update.effective_chat.id
         if "config" not in context.user_data:
             context.user_data["config"] = ConfiguracionUsuario()
         config = context.user_data["config"]
+        saltos = f"{config.sigma_alerta:g}σ" if config.sigma_alerta else "off"
 
         await update.message.reply_text(
             (
@@ -36,12 +119,15 @@ class BotHandlers:
                 "📊 *Configuración Actual:*\n"
                 f"• Alerta Tasa: *{config.tna_objetivo}%*\n"
                 f"• Intervalo Alerta: *{config.intervalo_minutos} min*\n"
-                f"• Gráfico Custom: *{config.dias_grafico_custom} días*\n\n"
+                f"• Gráfico Custom: *{config.dias_grafico_custom} días*\n"
+                f"• Alerta Saltos: *{saltos}*\n\n"
                 "🛠 *Comandos Nuevos:*\n"
                 "/tendencia → Ver las 3 líneas (Corto/Medio/Largo)\n"
                 "/set_tendencia 7 → Configurar gráfico de 7 días\n"
                 "/mitendencia → Ver TU gráfico personalizado\n"
+                "/mitendencia 30 → Tu gráfico con los últimos 30 días\n"
                 "/set 30 → Configurar alerta de tasa\n"
+                "/set_sigma 3 → Avisar saltos de 3σ o más (0 = off)\n"
                 "/stop → Detener alertas"
             ),
             parse_mode="Markdown",
@@ -70,13 +156,23 @@ class BotHandlers:
         if not self._servicio.tiene_datos_para_grafico():
             await update.message.reply_text("📉 Recolectando datos...")
             return
-        await update.message.reply_text("🎨 Generando gráfico general...")
-        historial = self._servicio.obtener_historial()
-        img = GeneradorGraficos.generar_tendencia_general(historial)
-        if img:
-            await update.message.reply_photo(
-                photo=img, caption="📊 *Tendencia Mercado*", parse_mode="Markdown"
-            )
+        clave = ("general", self._servicio.version_historial)
+        grafico = self._graficos.en_cache(clave)
+        if grafico is None:
+            if not self._graficos.acepta(clave):
+                await update.message.reply_text(MSG_OCUPADO)
+                return
+            await update.message.reply_text("🎨 Generando gráfico general...")
+            historial = self._servicio.obtener_historial()
+            try:
+                grafico = await self._graficos.generar(
+                    clave, "generar_tendencia_general", historial
+                )
+            except ServicioOcupadoError:
+                await update.message.reply_text(MSG_OCUPADO)
+                return
+        if grafico:
+            await self._enviar_grafico(update, grafico, "📊 *Tendencia Mercado*")
         else:
             await update.message.reply_text("❌ Error generando gráfico.")
 
@@ -86,27 +182,58 @@ class BotHandlers:
         if not self._servicio.tiene_datos_para_grafico():
             await update.message.reply_text("📉 Recolectando datos...")
             return
+        try:
+            ventana = int(context.args[0]) if context.args else None
+            if ventana is not None and not 1 <= ventana <= Config.ROLLUPS_RETENTION_DAYS:
+                raise ValueError
+        except ValueError:
+            await update.message.reply_text("❌ Uso: `/mitendencia 30`")
+            return
         config = context.user_data.get("config", ConfiguracionUsuario())
         dias = config.dias_grafico_custom
-        await update.message.reply_text(
-            f"🎨 Generando gráfico de *{dias} días*...", parse_mode="Markdown"
-        )
-        historial = self._servicio.obtener_historial()
-        img = GeneradorGraficos.generar_tendencia_custom(historial, dias)
-        if img:
-            await update.message.reply_photo(
-                photo=img,
-                caption=f"📊 *Tu Tendencia ({dias}d)*",
-                parse_mode="Markdown",
+        clave = ("custom", dias, ventana, self._servicio.version_historial)
+        grafico = self._graficos.en_cache(clave)
+        if grafico is None:
+            if not self._graficos.acepta(clave):
+                await update.message.reply_text(MSG_OCUPADO)
+                return
+            await update.message.reply_text(
+                f"🎨 Generando gráfico de *{dias} días*...", parse_mode="Markdown"
             )
+            historial = self._servicio.obtener_historial(ventana, plazo=dias)
+            try:
+                grafico = await self._graficos.generar(
+                    clave, "generar_tendencia_custom", historial, dias
+                )
+            except ServicioOcupadoError:
+                await update.message.reply_text(MSG_OCUPADO)
+                return
+        if grafico:
+            caption = f"📊 *Tu Tendencia ({dias}d)*"
+            if ventana:
+                caption += f" - últimos {ventana} días"
+            await self._enviar_grafico(update, grafico, caption)
         else:
             await update.message.reply_text(
                 f"⚠️ Sin datos recientes para {dias} días."
             )
 
+    @staticmethod
+    async def _enviar_grafico(update: Update, grafico: GraficoCacheado, caption: str) -> None:
+        # Con file_id Telegram reutiliza la foto ya subida: no se reenvía el PNG.
+        mensaje = await update.message.reply_photo(
+            photo=grafico.file_id or grafico.png,
+            caption=caption,
+            parse_mode="Markdown",
+        )
+        if grafico.file_id is None and mensaje.photo:
+            grafico.file_id = mensaje.photo[-1].file_id
+
     async def cmd_set_tna(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         try:
             val = float(context.args[0])
+            if not math.isfinite(val) or val < 0:
+                raise ValueError
             config = context.user_data.get("config", ConfiguracionUsuario())
             config.tna_objetivo = val
             context.user_data["config"] = config
@@ -134,68 +261,65 @@ class BotHandlers:
         except Exception:
             await update.message.reply_text("❌ Uso: `/tiempo 10`")
 
+    async def cmd_set_sigma(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        try:
+            val = float(context.args[0])
+            if not math.isfinite(val) or (val and val < Config.ESTADISTICAS_SIGMA_MINIMO):
+                raise ValueError
+            config = context.user_data.get("config", ConfiguracionUsuario())
+            config.sigma_alerta = val
+            context.user_data["config"] = config
+            self._actualizar_job_usuario(update.effective_chat.id, context)
+            texto = f"saltos ≥ {val:g}σ" if val else "de saltos desactivada"
+            await update.message.reply_text(f"✅ Alerta {texto}", parse_mode="Markdown")
+        except Exception:
+            await update.message.reply_text(
+                f"❌ Uso: `/set_sigma 3` (mínimo {Config.ESTADISTICAS_SIGMA_MINIMO:g}, 0 = off)"
+            )
+
     async def cmd_ahora(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         config = context.user_data.get("config", ConfiguracionUsuario())
-        res = self._servicio.analizar_mercado(config.tna_objetivo)
+        res = await self._servicio.analizar_mercado(config.tna_objetivo)
         if not res.top_3:
             await update.message.reply_text("📉 Sin datos ahora.")
             return
         await update.message.reply_text(
-            self._formateador.formatear_reporte_manual(res, config.tna_objetivo),
+            self._formateador.formatear_reporte_manual(
+                res, config.tna_objetivo, self._servicio.version
+            ),
+            parse_mode="Markdown",
+        )
+
+    async def cmd_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if update.effective_user.id not in Config.ADMIN_IDS:
+            return
+        await update.message.reply_text(
+            self._formateador.formatear_estadisticas(metricas.resumen()),
             parse_mode="Markdown",
         )
 
     async def cmd_stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        chat_id = update.effective_chat.id
-        for job in context.job_queue.get_jobs_by_name(str(chat_id)):
-            job.schedule_removal()
+        config = context.user_data.get("config")
+        if config is not None:
+            config.alertas_activas = False
+            context.user_data["config"] = config
+        self._despachador.desuscribir(update.effective_chat.id)
         await update.message.reply_text("🛑 Detenido.")
 
-    async def tarea_escaneo(self, context: ContextTypes.DEFAULT_TYPE) -> None:
-        job = context.job
-        config = job.data
-        res = self._servicio.analizar_mercado(config.tna_objetivo)
-        if not res.top_3:
-            return
-        if res.oportunidades or res.hay_alerta_critica:
-            try:
-                msg = self._formateador.formatear_reporte_completo(
-                    res, config.tna_objetivo
-                )
-                await context.bot.send_message(job.chat_id, msg, parse_mode="Markdown")
-            except Exception as exc:
-                if "Forbidden" in str(exc):
-                    job.schedule_removal()
-
     def _actualizar_job_usuario(
         self, chat_id: int, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        for job in context.job_queue.get_jobs_by_name(str(chat_id)):
-            job.schedule_removal()
         config = context.user_data.get("config", ConfiguracionUsuario())
-        context.job_queue.run_repeating(
-            self.tarea_escaneo,
-            interval=config.intervalo_minutos * 60,
-            first=5,
-            chat_id=chat_id,
-            name=str(chat_id),
-            data=config,
-        )
+        config.alertas_activas = True
+        self._despachador.suscribir(chat_id, config)
 
     async def restaurar_tareas(self, application: Application) -> None:
         if not application.user_data:
             return
-        count = 0
-        for chat_id, data in application.user_data.items():
-            if "config" in data:
-                config = data["config"]
-                application.job_queue.run_repeating(
-                    self.tarea_escaneo,
-                    interval=config.intervalo_minutos * 60,
-                    first=10 + (count * 2),
-                    chat_id=chat_id,
-                    name=str(chat_id),
-                    data=config,
-                )
-                count += 1
-        logging.info("🔄 Tareas restauradas para %s usuarios.", count)
+        configs = {
+            chat_id: data["config"]
+            for chat_id, data in application.user_data.items()
+            if "config" in data and data["config"].alertas_activas
+        }
+        self._despachador.restaurar(configs)
+        logging.info("🔄 Tareas restauradas para %s usuarios.", len(configs))
@@ -0,0 +1,37 @@
+"""Migra las configuraciones de usuario del pickle de PicklePersistence a SQLite.
+
+Uso: python -m cauciones_bot.migrar_pickle [--origen bot_datos_usuarios_v2.pickle]
+                                           [--destino bot_datos_usuarios.sqlite3]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from telegram.ext import PicklePersistence
+
+from cauciones_bot.config import Config
+from cauciones_bot.services.persistencia import PersistenciaSQLite
+
+
+def migrar(origen: str, destino: str) -> int:
+    if not Path(origen).exists():
+        raise FileNotFoundError(f"No existe {origen}")
+    user_data = asyncio.run(PicklePersistence(filepath=origen).get_user_data())
+    persistencia = PersistenciaSQLite(destino)
+    try:
+        return persistencia.importar(user_data)
+    finally:
+        asyncio.run(persistencia.flush())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--origen", default=Config.PERSISTENCE_FILE)
+    parser.add_argument("--destino", default=Config.PERSISTENCE_DB_FILE)
+    args = parser.parse_args()
+    migrados = migrar(args.origen, args.destino)
+    print(f"✅ {migrados} usuarios migrados a {args.destino}.")
+
+
+if __name__ == "__main__":
+    main()
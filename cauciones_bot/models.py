@@ -1,6 +1,7 @@
-from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, List, Optional
+from dataclasses import dataclass, fields, replace
+from typing import List, Optional
+
+import numpy as np
 
 from cauciones_bot.config import Config
 
@@ -10,6 +11,8 @@ class DatosCaucion:
     dias: int
     tasa: float
     raw_tasa: str = ""
+    fuente: str = "iol"
+    moneda: str = Config.MONEDA_PRINCIPAL
 
     def __post_init__(self) -> None:
         if self.dias < 0:
@@ -18,10 +21,89 @@ class DatosCaucion:
             raise ValueError("La tasa no puede ser negativa")
 
 
-@dataclass
-class PuntoHistorial:
-    hora: datetime
-    tasas_por_plazo: Dict[int, float] = field(default_factory=dict)
+@dataclass(frozen=True)
+class TablaCauciones:
+    dias: np.ndarray
+    tasas: np.ndarray
+    raw_tasas: np.ndarray
+
+    @classmethod
+    def vacia(cls) -> "TablaCauciones":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=object),
+        )
+
+    def __len__(self) -> int:
+        return len(self.dias)
+
+    def a_datos(
+        self, fuente: str = "iol", moneda: str = Config.MONEDA_PRINCIPAL
+    ) -> List[DatosCaucion]:
+        return [
+            DatosCaucion(dias=dias, tasa=tasa, raw_tasa=raw, fuente=fuente, moneda=moneda)
+            for dias, tasa, raw in zip(
+                self.dias.tolist(), self.tasas.tolist(), self.raw_tasas.tolist()
+            )
+        ]
+
+
+@dataclass(frozen=True)
+class VistaHistorial:
+    ts: np.ndarray
+    plazos: np.ndarray
+    tasas: np.ndarray
+    # (puntos, tramos, estadístico): ver AGG_* en services/serie.py
+    agregados: Optional[np.ndarray] = None
+    # Solo en rollups: tasas es el cierre de cada bucket y estos sus extremos.
+    maximos: Optional[np.ndarray] = None
+    minimos: Optional[np.ndarray] = None
+    resolucion: int = Config.HISTORY_MIN_INTERVAL_SECONDS
+
+    @classmethod
+    def vacia(cls) -> "VistaHistorial":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty((0, 0), dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def copia(self) -> "VistaHistorial":
+        # Las vistas de SerieTasas apuntan al buffer del historial, que se
+        # compacta en agregar(): para usarlas fuera del event loop hace falta
+        # una copia propia.
+        arreglos = {
+            campo.name: getattr(self, campo.name).copy()
+            for campo in fields(self)
+            if isinstance(getattr(self, campo.name), np.ndarray)
+        }
+        return replace(self, **arreglos)
+
+    def horas(self) -> np.ndarray:
+        return self.ts.astype("datetime64[s]")
+
+    def columna(self, plazo: int, matriz: Optional[np.ndarray] = None) -> np.ndarray:
+        matriz = self.tasas if matriz is None else matriz
+        idx = np.searchsorted(self.plazos, plazo)
+        if idx < len(self.plazos) and self.plazos[idx] == plazo:
+            return matriz[:, idx]
+        return np.full(len(self.ts), np.nan)
+
+
+@dataclass(frozen=True)
+class SaltoTasa:
+    ts: int
+    plazo: int
+    tasa: float
+    ewma: float
+    zscore: float
+    # Rango del día hasta este punto, incluido.
+    minimo: float
+    maximo: float
 
 
 @dataclass
@@ -29,12 +111,17 @@ class ConfiguracionUsuario:
     tna_objetivo: float = Config.DEFAULT_TNA_OBJETIVO
     intervalo_minutos: int = Config.DEFAULT_INTERVALO_MINUTOS
     dias_grafico_custom: int = Config.DEFAULT_DIAS_GRAFICO
+    # 0 = sin alertas de salto.
+    sigma_alerta: float = 0.0
+    # /stop la apaga; se persiste para que un reinicio no reactive las alertas.
+    alertas_activas: bool = True
 
     def validar(self) -> bool:
         return (
             self.tna_objetivo >= 0
             and self.intervalo_minutos >= 1
             and self.dias_grafico_custom >= 1
+            and self.sigma_alerta >= 0
         )
 
 
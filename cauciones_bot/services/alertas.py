@@ -0,0 +1,248 @@
+import bisect
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import (
+    ConfiguracionUsuario,
+    DatosCaucion,
+    ResultadoAnalisis,
+    SaltoTasa,
+)
+from cauciones_bot.services.analytics import AnalizadorMercado
+from cauciones_bot.services.metricas import metricas
+
+Pares = Tuple[Tuple[int, float], ...]
+
+
+def _config_valida(config: ConfiguracionUsuario) -> bool:
+    # Un NaN rompe el orden de las listas bisect y después no se puede quitar.
+    return all(
+        math.isfinite(valor) and valor >= 0
+        for valor in (config.tna_objetivo, config.sigma_alerta)
+    )
+
+
+@dataclass(frozen=True)
+class HuellaResultado:
+    top_3: Pares
+    oportunidades: Pares
+    alerta_critica: bool
+
+    @classmethod
+    def de(cls, res: ResultadoAnalisis) -> "HuellaResultado":
+        # Solo lo que muestra el reporte: el formateador corta en 5 oportunidades.
+        return cls(
+            tuple((d.dias, d.tasa) for d in res.top_3),
+            tuple((d.dias, d.tasa) for d in res.oportunidades[:5]),
+            res.hay_alerta_critica,
+        )
+
+    def difiere(self, otra: "HuellaResultado", delta_tasa: float) -> bool:
+        if self.alerta_critica != otra.alerta_critica:
+            return True
+        for propios, ajenos in ((self.top_3, otra.top_3), (self.oportunidades, otra.oportunidades)):
+            if len(propios) != len(ajenos):
+                return True
+            for (dias, tasa), (dias_otra, tasa_otra) in zip(propios, ajenos):
+                if dias != dias_otra or abs(tasa - tasa_otra) >= delta_tasa:
+                    return True
+        return False
+
+
+@dataclass
+class Suscripcion:
+    chat_id: int
+    config: ConfiguracionUsuario
+    umbral: float
+    ultimo_envio: float = 0.0
+    huella: Optional[HuellaResultado] = None
+    sigma: float = 0.0
+    # ts del último punto del historial cuyos saltos ya se avisaron.
+    ultimo_salto: int = 0
+
+
+@dataclass
+class Alerta:
+    suscripcion: Suscripcion
+    # None si solo se dispara por saltos: la tasa no llegó al umbral.
+    resultado: Optional[ResultadoAnalisis]
+    saltos: Tuple[SaltoTasa, ...] = ()
+
+
+class DespachadorAlertas:
+    def __init__(
+        self, analizador: AnalizadorMercado, delta_tasa: float = Config.ALERTAS_DELTA_TASA
+    ) -> None:
+        self._analizador = analizador
+        self._delta_tasa = delta_tasa
+        self._suscripciones: Dict[int, Suscripcion] = {}
+        # (tna_objetivo, chat_id) ordenado para resolver umbrales con bisect.
+        self._umbrales: List[Tuple[float, int]] = []
+        # Ídem con (sigma_alerta, chat_id), solo de quienes la activaron.
+        self._sigmas: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._suscripciones)
+
+    def suscribir(self, chat_id: int, config: ConfiguracionUsuario) -> None:
+        if not _config_valida(config):
+            raise ValueError(f"Configuración de alertas inválida para {chat_id}: {config}")
+        self.desuscribir(chat_id)
+        suscripcion = Suscripcion(
+            chat_id, config, config.tna_objetivo, sigma=config.sigma_alerta
+        )
+        self._suscripciones[chat_id] = suscripcion
+        bisect.insort(self._umbrales, (suscripcion.umbral, chat_id))
+        if suscripcion.sigma:
+            bisect.insort(self._sigmas, (suscripcion.sigma, chat_id))
+
+    def restaurar(
+        self, configs: Dict[int, ConfiguracionUsuario], ahora: Optional[float] = None
+    ) -> None:
+        # Tras un reinicio nadie tiene envío previo: la primera alerta de cada
+        # usuario se reparte a lo largo de su intervalo en vez de caer toda junta
+        # en la primera recolección.
+        ahora = ahora if ahora is not None else time.time()
+        invalidas = [
+            chat_id for chat_id, config in configs.items() if not _config_valida(config)
+        ]
+        if invalidas:
+            logging.warning("⚠️ Alertas sin restaurar por configuración inválida: %s", invalidas)
+            configs = {k: v for k, v in configs.items() if k not in invalidas}
+        total = len(configs)
+        for idx, (chat_id, config) in enumerate(configs.items()):
+            intervalo = config.intervalo_minutos * 60
+            self._suscripciones[chat_id] = Suscripcion(
+                chat_id,
+                config,
+                config.tna_objetivo,
+                ahora - intervalo * (1 - idx / total),
+                sigma=config.sigma_alerta,
+            )
+        self._umbrales = sorted((s.umbral, s.chat_id) for s in self._suscripciones.values())
+        self._sigmas = sorted(
+            (s.sigma, s.chat_id) for s in self._suscripciones.values() if s.sigma
+        )
+
+    def sincronizar(self, configs: Dict[int, ConfiguracionUsuario]) -> None:
+        # Cambios hechos por otros workers: solo se toca a quien cambió de verdad,
+        # así no se pierde su ultimo_envio ni su huella.
+        for chat_id, config in configs.items():
+            actual = self._suscripciones.get(chat_id)
+            if not config.alertas_activas or not _config_valida(config):
+                self.desuscribir(chat_id)
+            elif actual is None or actual.config != config:
+                self.suscribir(chat_id, config)
+
+    def desuscribir(self, chat_id: int) -> bool:
+        suscripcion = self._suscripciones.pop(chat_id, None)
+        if suscripcion is None:
+            return False
+        _quitar(self._umbrales, (suscripcion.umbral, chat_id))
+        if suscripcion.sigma:
+            _quitar(self._sigmas, (suscripcion.sigma, chat_id))
+        return True
+
+    def evaluar(
+        self,
+        datos: List[DatosCaucion],
+        ahora: Optional[float] = None,
+        saltos: Sequence[SaltoTasa] = (),
+    ) -> List[Alerta]:
+        """Umbrales de tasa y saltos en sigmas, en una sola pasada por los suscriptores."""
+        if not datos or not self._umbrales:
+            return []
+        ahora = ahora if ahora is not None else time.time()
+
+        tasa_max_oportunidad = max(
+            (
+                dato.tasa
+                for dato in datos
+                if Config.MIN_DIAS_OPORTUNIDADES <= dato.dias <= Config.MAX_DIAS_OPORTUNIDADES
+            ),
+            default=None,
+        )
+        hay_alerta = any(dato.tasa >= Config.TASA_ALERTA_CRITICA for dato in datos)
+
+        if hay_alerta:
+            limite = len(self._umbrales)
+        elif tasa_max_oportunidad is None:
+            limite = 0
+        else:
+            limite = bisect.bisect_right(self._umbrales, (tasa_max_oportunidad, math.inf))
+
+        # Los saltos de un punto viejo (reinicio, mercado cerrado) no se avisan.
+        ts_saltos = saltos[0].ts if saltos else 0
+        if saltos and ahora - ts_saltos <= 2 * Config.HISTORY_MIN_INTERVAL_SECONDS:
+            z_max = abs(saltos[0].zscore)
+            limite_sigma = bisect.bisect_right(self._sigmas, (z_max, math.inf))
+        else:
+            limite_sigma = 0
+
+        candidatos = [chat_id for _, chat_id in self._umbrales[:limite]]
+        por_umbral = len(candidatos)
+        if limite_sigma:
+            vistos = set(candidatos)
+            candidatos += [
+                chat_id for _, chat_id in self._sigmas[:limite_sigma] if chat_id not in vistos
+            ]
+
+        pendientes: List[Tuple[bool, Suscripcion]] = []
+        for idx, chat_id in enumerate(candidatos):
+            suscripcion = self._suscripciones[chat_id]
+            por_tasa = idx < por_umbral
+            if ahora - suscripcion.ultimo_envio < suscripcion.config.intervalo_minutos * 60:
+                # El intervalo solo frena el reporte por umbral: un salto no se
+                # repite (ultimo_salto) y si esperara el intervalo se perdería.
+                salto_nuevo = ts_saltos > suscripcion.ultimo_salto
+                if not (suscripcion.sigma and limite_sigma and salto_nuevo):
+                    continue
+                por_tasa = False
+            pendientes.append((por_tasa, suscripcion))
+        # Un solo análisis del snapshot para todos los umbrales; los que caen
+        # entre las mismas tasas comparten resultado y huella.
+        analisis = self._analizador.analizar_lote(
+            datos, (suscripcion.umbral for por_tasa, suscripcion in pendientes if por_tasa)
+        )
+        huellas: Dict[int, HuellaResultado] = {}
+
+        resultados: List[Alerta] = []
+        for por_tasa, suscripcion in pendientes:
+            propios: Tuple[SaltoTasa, ...] = ()
+            if suscripcion.sigma and limite_sigma and ts_saltos > suscripcion.ultimo_salto:
+                propios = tuple(s for s in saltos if abs(s.zscore) >= suscripcion.sigma)
+
+            res: Optional[ResultadoAnalisis] = None
+            if por_tasa and analisis[suscripcion.umbral].top_3:
+                res = analisis[suscripcion.umbral]
+                huella = huellas.get(id(res))
+                if huella is None:
+                    huella = huellas[id(res)] = HuellaResultado.de(res)
+                if suscripcion.huella is not None and not huella.difiere(
+                    suscripcion.huella, self._delta_tasa
+                ):
+                    # Mismo reporte que el último enviado: no se formatea ni se envía.
+                    # ultimo_envio no avanza, así el próximo cambio real sale enseguida.
+                    metricas.incrementar("alertas_suprimidas")
+                    res = None
+                else:
+                    suscripcion.huella = huella
+            if res is None and not propios:
+                continue
+            if res is not None:
+                suscripcion.ultimo_envio = ahora
+            if propios:
+                suscripcion.ultimo_salto = ts_saltos
+                metricas.incrementar("alertas_salto")
+            resultados.append(Alerta(suscripcion, res, propios))
+        return resultados
+
+
+def _quitar(ordenada: List[Tuple[float, int]], clave: Tuple[float, int]) -> None:
+    idx = bisect.bisect_left(ordenada, clave)
+    if idx < len(ordenada) and ordenada[idx] == clave:
+        del ordenada[idx]
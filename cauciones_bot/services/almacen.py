@@ -0,0 +1,241 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import VistaHistorial
+from cauciones_bot.services.serie import calcular_agregados, mascaras_tramos
+
+
+class AlmacenHistorial:
+    def __init__(
+        self,
+        ruta: str = Config.HISTORY_DB_FILE,
+        retencion_dias: int = Config.HISTORY_RETENTION_DAYS,
+        solo_lectura: bool = False,
+    ) -> None:
+        self._retencion = retencion_dias * 86400
+        self._retencion_rollups = Config.ROLLUPS_RETENTION_DAYS * 86400
+        self._escrituras = 0
+        if solo_lectura:
+            # Base del colector: sin DDL ni PRAGMAs de escritura; SQLite rechaza
+            # cualquier escritura accidental.
+            uri = Path(ruta).resolve().as_uri() + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasas (
+                ts INTEGER NOT NULL,
+                plazo INTEGER NOT NULL,
+                tasa REAL NOT NULL,
+                PRIMARY KEY (ts, plazo)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasas_plazo_ts ON tasas (plazo, ts)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rollups (
+                resolucion INTEGER NOT NULL,
+                plazo INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                apertura REAL NOT NULL,
+                maximo REAL NOT NULL,
+                minimo REAL NOT NULL,
+                cierre REAL NOT NULL,
+                PRIMARY KEY (resolucion, plazo, ts)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def abrir_solo_lectura(cls, ruta: str) -> Optional["AlmacenHistorial"]:
+        """None si el colector todavía no creó la base o sus tablas."""
+        try:
+            almacen = cls(ruta, solo_lectura=True)
+        except sqlite3.OperationalError:
+            return None
+        try:
+            almacen.extremos()
+        except sqlite3.OperationalError:
+            almacen.cerrar()
+            return None
+        return almacen
+
+    def agregar(self, ts: int, tasas_por_plazo: Dict[int, float]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasas (ts, plazo, tasa) VALUES (?, ?, ?)",
+                [(ts, plazo, tasa) for plazo, tasa in tasas_por_plazo.items()],
+            )
+        self._escrituras += 1
+        if self._escrituras % Config.HISTORY_PURGE_EVERY == 0:
+            self.purgar()
+
+    def importar(self, ts: np.ndarray, plazos: np.ndarray, tasas: np.ndarray) -> int:
+        validos = ~np.isnan(tasas)
+        registros = zip(ts[validos].tolist(), plazos[validos].tolist(), tasas[validos].tolist())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasas (ts, plazo, tasa) VALUES (?, ?, ?)", registros
+            )
+        return int(validos.sum())
+
+    def iterar_lotes(
+        self, desde: int = 0, hasta: Optional[int] = None, lote: int = Config.VOLCADO_LOTE_FILAS
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        # Formato largo (ts, plazo, tasa) de a `lote` filas: la base nunca se
+        # carga entera en memoria.
+        cursor = self._conn.execute(
+            "SELECT ts, plazo, tasa FROM tasas WHERE ts >= ? AND ts <= ? ORDER BY ts, plazo",
+            (desde, hasta if hasta is not None else 2**62),
+        )
+        while True:
+            filas = cursor.fetchmany(lote)
+            if not filas:
+                return
+            ts, plazos, tasas = zip(*filas)
+            yield (
+                np.array(ts, dtype=np.int64),
+                np.array(plazos, dtype=np.int32),
+                np.array(tasas, dtype=np.float64),
+            )
+
+    def purgar(self) -> None:
+        ahora = int(time.time())
+        with self._conn:
+            self._conn.execute("DELETE FROM tasas WHERE ts < ?", (ahora - self._retencion,))
+            self._conn.execute(
+                "DELETE FROM rollups WHERE ts < ?", (ahora - self._retencion_rollups,)
+            )
+
+    def guardar_rollups(
+        self,
+        resolucion: int,
+        ts: np.ndarray,
+        plazos: np.ndarray,
+        apertura: np.ndarray,
+        maximo: np.ndarray,
+        minimo: np.ndarray,
+        cierre: np.ndarray,
+    ) -> None:
+        filas, cols = np.nonzero(~np.isnan(cierre))
+        registros = zip(
+            [resolucion] * len(filas),
+            ts[filas].tolist(),
+            plazos[cols].tolist(),
+            apertura[filas, cols].tolist(),
+            maximo[filas, cols].tolist(),
+            minimo[filas, cols].tolist(),
+            cierre[filas, cols].tolist(),
+        )
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rollups "
+                "(resolucion, ts, plazo, apertura, maximo, minimo, cierre) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                registros,
+            )
+
+    def bucket_rollup(
+        self, resolucion: int, ts: int
+    ) -> List[Tuple[int, float, float, float, float]]:
+        return self._conn.execute(
+            "SELECT plazo, apertura, maximo, minimo, cierre FROM rollups "
+            "WHERE resolucion = ? AND ts = ?",
+            (resolucion, ts),
+        ).fetchall()
+
+    def hay_rollups(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is not None
+
+    def extremos(self) -> Optional[Tuple[int, int]]:
+        desde, hasta = self._conn.execute("SELECT MIN(ts), MAX(ts) FROM tasas").fetchone()
+        return (desde, hasta) if desde is not None else None
+
+    def rango_rollup(
+        self,
+        resolucion: int,
+        desde: int,
+        hasta: Optional[int] = None,
+        plazo: Optional[int] = None,
+    ) -> VistaHistorial:
+        consulta = (
+            "SELECT ts, plazo, cierre, maximo, minimo FROM rollups "
+            "WHERE resolucion = ? AND ts >= ? AND ts <= ?"
+        )
+        parametros: tuple = (resolucion, desde, hasta if hasta is not None else 2**62)
+        if plazo is not None:
+            consulta += " AND plazo = ?"
+            parametros += (plazo,)
+        filas = self._conn.execute(consulta + " ORDER BY ts", parametros).fetchall()
+        if not filas:
+            return VistaHistorial.vacia()
+        ts, plazos, (cierre, maximo, minimo) = self._a_matrices(filas)
+        return VistaHistorial(
+            ts,
+            plazos,
+            cierre,
+            calcular_agregados(cierre, mascaras_tramos(plazos)),
+            maximos=maximo,
+            minimos=minimo,
+            resolucion=resolucion,
+        )
+
+    def rango(
+        self,
+        desde: int,
+        hasta: Optional[int] = None,
+        plazo: Optional[int] = None,
+    ) -> VistaHistorial:
+        consulta = "SELECT ts, plazo, tasa FROM tasas WHERE ts >= ? AND ts <= ?"
+        parametros: tuple = (desde, hasta if hasta is not None else 2**62)
+        if plazo is not None:
+            consulta += " AND plazo = ?"
+            parametros += (plazo,)
+        filas = self._conn.execute(consulta + " ORDER BY ts", parametros).fetchall()
+        return self._a_vista(filas)
+
+    def recientes(self, limite: int) -> VistaHistorial:
+        (desde,) = self._conn.execute(
+            "SELECT MIN(ts) FROM (SELECT DISTINCT ts FROM tasas ORDER BY ts DESC LIMIT ?)",
+            (limite,),
+        ).fetchone()
+        if desde is None:
+            return VistaHistorial.vacia()
+        filas = self._conn.execute(
+            "SELECT ts, plazo, tasa FROM tasas WHERE ts >= ? ORDER BY ts", (desde,)
+        ).fetchall()
+        return self._a_vista(filas)
+
+    def cerrar(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _a_matrices(filas) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+        datos = np.array(filas, dtype=np.float64)
+        ts, fila_idx = np.unique(datos[:, 0].astype(np.int64), return_inverse=True)
+        plazos, col_idx = np.unique(datos[:, 1].astype(np.int64), return_inverse=True)
+        matrices = []
+        for columna in range(2, datos.shape[1]):
+            matriz = np.full((len(ts), len(plazos)), np.nan)
+            matriz[fila_idx, col_idx] = datos[:, columna]
+            matrices.append(matriz)
+        return ts, plazos, matrices
+
+    @classmethod
+    def _a_vista(cls, filas) -> VistaHistorial:
+        if not filas:
+            return VistaHistorial.vacia()
+        ts, plazos, (tasas,) = cls._a_matrices(filas)
+        agregados = calcular_agregados(tasas, mascaras_tramos(plazos))
+        return VistaHistorial(ts, plazos, tasas, agregados)
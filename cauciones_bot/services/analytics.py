@@ -1,29 +1,79 @@
-from typing import List
+import bisect
+import math
+from typing import Dict, Iterable, List
 
 from cauciones_bot.config import Config
 from cauciones_bot.models import DatosCaucion, ResultadoAnalisis
+from cauciones_bot.services.metricas import metricas
 
 
 class AnalizadorMercado:
     @staticmethod
     def analizar(datos: List[DatosCaucion], tasa_objetivo: float) -> ResultadoAnalisis:
-        if not datos:
-            return ResultadoAnalisis([], [], False)
-
-        datos_top = [dato for dato in datos if dato.dias <= Config.MAX_DIAS_TOP3]
-        top_3 = sorted(datos_top, key=lambda item: item.tasa, reverse=True)[:3]
-
-        oportunidades = sorted(
-            [
-                dato
-                for dato in datos
-                if dato.tasa >= tasa_objetivo
-                and Config.MIN_DIAS_OPORTUNIDADES <= dato.dias <= Config.MAX_DIAS_OPORTUNIDADES
-            ],
-            key=lambda item: item.dias,
-        )
-
-        hay_alerta = any(dato.tasa >= 100 for dato in datos)
-        tasa_max = max(dato.tasa for dato in datos)
-
-        return ResultadoAnalisis(oportunidades, top_3, hay_alerta, tasa_max)
+        with metricas.cronometro("analizar"):
+            if not datos:
+                return ResultadoAnalisis([], [], False)
+
+            datos_top = [dato for dato in datos if dato.dias <= Config.MAX_DIAS_TOP3]
+            top_3 = sorted(datos_top, key=lambda item: item.tasa, reverse=True)[:3]
+
+            oportunidades = sorted(
+                [
+                    dato
+                    for dato in datos
+                    if dato.tasa >= tasa_objetivo
+                    and Config.MIN_DIAS_OPORTUNIDADES <= dato.dias <= Config.MAX_DIAS_OPORTUNIDADES
+                ],
+                key=lambda item: item.dias,
+            )
+
+            hay_alerta = any(dato.tasa >= Config.TASA_ALERTA_CRITICA for dato in datos)
+            tasa_max = max(dato.tasa for dato in datos)
+
+            return ResultadoAnalisis(oportunidades, top_3, hay_alerta, tasa_max)
+
+    @staticmethod
+    def analizar_lote(
+        datos: List[DatosCaucion], tasas_objetivo: Iterable[float]
+    ) -> Dict[float, ResultadoAnalisis]:
+        """Equivale a analizar() para cada tasa objetivo, ordenando el snapshot una sola vez.
+
+        Top 3, tasa máxima y alerta crítica no dependen del objetivo y se
+        comparten. Las oportunidades solo cambian al cruzar alguna tasa del
+        snapshot: los objetivos entre dos tasas consecutivas reciben el mismo
+        resultado.
+        """
+        with metricas.cronometro("analizar_lote"):
+            objetivos = set(tasas_objetivo)
+            if not datos:
+                return dict.fromkeys(objetivos, ResultadoAnalisis([], [], False))
+
+            datos_top = [dato for dato in datos if dato.dias <= Config.MAX_DIAS_TOP3]
+            top_3 = sorted(datos_top, key=lambda item: item.tasa, reverse=True)[:3]
+            hay_alerta = any(dato.tasa >= Config.TASA_ALERTA_CRITICA for dato in datos)
+            tasa_max = max(dato.tasa for dato in datos)
+
+            elegibles = sorted(
+                (
+                    dato
+                    for dato in datos
+                    if Config.MIN_DIAS_OPORTUNIDADES <= dato.dias <= Config.MAX_DIAS_OPORTUNIDADES
+                ),
+                key=lambda item: item.dias,
+            )
+            cortes = sorted({dato.tasa for dato in elegibles})
+
+            por_corte: Dict[int, ResultadoAnalisis] = {}
+            resultados: Dict[float, ResultadoAnalisis] = {}
+            for tasa_objetivo in objetivos:
+                # tasa >= objetivo  <=>  tasa >= menor corte que no está por debajo del objetivo.
+                idx = bisect.bisect_left(cortes, tasa_objetivo)
+                res = por_corte.get(idx)
+                if res is None:
+                    minima = cortes[idx] if idx < len(cortes) else math.inf
+                    oportunidades = [dato for dato in elegibles if dato.tasa >= minima]
+                    res = por_corte[idx] = ResultadoAnalisis(
+                        oportunidades, top_3, hay_alerta, tasa_max
+                    )
+                resultados[tasa_objetivo] = res
+            return resultados
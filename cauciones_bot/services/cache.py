@@ -1,14 +1,33 @@
+import asyncio
+import logging
 import time
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
 
 from cauciones_bot.config import Config
 from cauciones_bot.models import DatosCaucion
+from cauciones_bot.services.metricas import metricas
+
+CargadorDatos = Callable[[], Awaitable[List[DatosCaucion]]]
 
 
 class CacheService:
-    def __init__(self, ttl_seconds: int = Config.CACHE_TTL_SECONDS) -> None:
+    def __init__(
+        self,
+        ttl_seconds: int = Config.CACHE_TTL_SECONDS,
+        stale_seconds: int = Config.CACHE_STALE_SECONDS,
+        backoff_seconds: float = Config.CACHE_BACKOFF_SECONDS,
+        backoff_max_seconds: float = Config.CACHE_BACKOFF_MAX_SECONDS,
+    ) -> None:
         self._cache: Dict[str, object] = {"timestamp": 0.0, "data": []}
         self._ttl = ttl_seconds
+        self._stale = stale_seconds
+        self._backoff = backoff_seconds
+        self._backoff_max = backoff_max_seconds
+        self._fallos = 0
+        self._backoff_hasta = 0.0
+        self._en_curso: Optional["asyncio.Task[List[DatosCaucion]]"] = None
 
     def get(self) -> Optional[List[DatosCaucion]]:
         now = time.time()
@@ -19,3 +38,114 @@ class CacheService:
     def set(self, data: List[DatosCaucion]) -> None:
         self._cache["data"] = data
         self._cache["timestamp"] = time.time()
+        self._fallos = 0
+        self._backoff_hasta = 0.0
+
+    async def obtener(self, cargar: CargadorDatos, forzar: bool = False) -> List[DatosCaucion]:
+        datos = None if forzar else self.get()
+        if datos:
+            metricas.incrementar("cache_aciertos")
+            return datos
+        if not forzar:
+            metricas.incrementar("cache_fallos")
+
+        if time.time() < self._backoff_hasta:
+            return self._datos_vigentes()
+
+        vigentes = self._datos_vigentes()
+        if vigentes and not forzar:
+            # Stale-while-revalidate: se sirve el último snapshot bueno
+            # mientras un único refresco corre en segundo plano.
+            metricas.incrementar("cache_obsoletos")
+            self._refrescar(cargar)
+            return vigentes
+
+        # shield: si un waiter se cancela no cancela la carga compartida.
+        return await asyncio.shield(self._refrescar(cargar))
+
+    def _refrescar(self, cargar: CargadorDatos) -> "asyncio.Task[List[DatosCaucion]]":
+        if self._en_curso is None or self._en_curso.done():
+            self._en_curso = asyncio.create_task(self._ejecutar_carga(cargar))
+        return self._en_curso
+
+    async def _ejecutar_carga(self, cargar: CargadorDatos) -> List[DatosCaucion]:
+        try:
+            datos = await cargar()
+        except Exception as exc:
+            logging.error("❌ Error refrescando cache: %s", exc)
+            datos = []
+
+        if datos:
+            self.set(datos)
+            return datos
+
+        self._fallos += 1
+        espera = min(self._backoff * 2 ** (self._fallos - 1), self._backoff_max)
+        self._backoff_hasta = time.time() + espera
+        logging.warning(
+            "⏳ Cache: fallo #%s, reintento en %.0fs.", self._fallos, espera
+        )
+        return self._datos_vigentes()
+
+    def _datos_vigentes(self) -> List[DatosCaucion]:
+        edad = time.time() - self._cache["timestamp"]  # type: ignore[operator]
+        if edad < self._ttl + self._stale:
+            return self._cache["data"]  # type: ignore[return-value]
+        return []
+
+
+@dataclass
+class GraficoCacheado:
+    png: bytes
+    file_id: Optional[str] = None
+
+
+class CacheGraficos:
+    def __init__(
+        self,
+        max_bytes: int = Config.CACHE_GRAFICOS_MAX_BYTES,
+        max_entradas: int = Config.CACHE_GRAFICOS_MAX_ENTRADAS,
+    ) -> None:
+        self._entradas: "OrderedDict[Hashable, GraficoCacheado]" = OrderedDict()
+        self._max_bytes = max_bytes
+        self._max_entradas = max_entradas
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, clave: Hashable) -> Optional[GraficoCacheado]:
+        grafico = self._entradas.get(clave)
+        if grafico is None:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return grafico
+
+    def set(self, clave: Hashable, png: bytes) -> GraficoCacheado:
+        self._descartar(clave)
+        grafico = GraficoCacheado(png)
+        if len(png) > self._max_bytes:
+            return grafico
+        self._entradas[clave] = grafico
+        self._bytes += len(png)
+        while self._bytes > self._max_bytes or len(self._entradas) > self._max_entradas:
+            _, viejo = self._entradas.popitem(last=False)
+            self._bytes -= len(viejo.png)
+        return grafico
+
+    def invalidar(self) -> None:
+        self._entradas.clear()
+        self._bytes = 0
+
+    def _descartar(self, clave: Hashable) -> None:
+        viejo = self._entradas.pop(clave, None)
+        if viejo is not None:
+            self._bytes -= len(viejo.png)
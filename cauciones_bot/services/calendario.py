@@ -0,0 +1,92 @@
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional
+
+import pytz
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion
+
+TZ_AR = pytz.timezone("America/Argentina/Buenos_Aires")
+
+
+class CalendarioMercado:
+    def __init__(
+        self,
+        apertura: str = Config.MERCADO_APERTURA,
+        cierre: str = Config.MERCADO_CIERRE,
+        feriados_fijos: FrozenSet[str] = Config.MERCADO_FERIADOS_FIJOS,
+        feriados: FrozenSet[str] = Config.MERCADO_FERIADOS,
+    ) -> None:
+        self._apertura = datetime.strptime(apertura, "%H:%M").time()
+        self._cierre = datetime.strptime(cierre, "%H:%M").time()
+        self._feriados_fijos = feriados_fijos
+        self._feriados = feriados
+
+    def es_habil(self, dia: date) -> bool:
+        return (
+            dia.weekday() < 5
+            and dia.strftime("%m-%d") not in self._feriados_fijos
+            and dia.isoformat() not in self._feriados
+        )
+
+    def apertura(self, dia: date) -> datetime:
+        return TZ_AR.localize(datetime.combine(dia, self._apertura))
+
+    def cierre(self, dia: date) -> datetime:
+        return TZ_AR.localize(datetime.combine(dia, self._cierre))
+
+    def esta_abierto(self, ahora: datetime) -> bool:
+        ahora = ahora.astimezone(TZ_AR)
+        dia = ahora.date()
+        return self.es_habil(dia) and self.apertura(dia) <= ahora < self.cierre(dia)
+
+    def proxima_apertura(self, ahora: datetime) -> datetime:
+        ahora = ahora.astimezone(TZ_AR)
+        dia = ahora.date()
+        if ahora >= self.apertura(dia):
+            dia += timedelta(days=1)
+        while not self.es_habil(dia):
+            dia += timedelta(days=1)
+        return self.apertura(dia)
+
+
+class PlanificadorRecoleccion:
+    def __init__(self, calendario: CalendarioMercado) -> None:
+        self._calendario = calendario
+        self._tasas_previas: Dict[int, float] = {}
+        self._volatil_hasta = 0.0
+
+    def registrar_snapshot(self, datos: List[DatosCaucion]) -> float:
+        tasas = {}
+        for dato in datos:
+            tasas[dato.dias] = max(dato.tasa, tasas.get(dato.dias, dato.tasa))
+        deltas = [
+            abs(tasa - self._tasas_previas[dias])
+            for dias, tasa in tasas.items()
+            if dias in self._tasas_previas
+        ]
+        delta = max(deltas, default=0.0)
+        self._tasas_previas = tasas
+        if delta >= Config.VOLATILIDAD_UMBRAL_TNA:
+            self._volatil_hasta = time.time() + Config.VOLATILIDAD_VENTANA_SECONDS
+        return delta
+
+    def proximo_intervalo(self, ahora: Optional[datetime] = None) -> float:
+        ahora = (ahora or datetime.now(TZ_AR)).astimezone(TZ_AR)
+        if not self._calendario.esta_abierto(ahora):
+            # Mercado cerrado: dormir hasta poco antes de la próxima rueda.
+            apertura = self._calendario.proxima_apertura(ahora)
+            espera = (apertura - ahora).total_seconds() - Config.MERCADO_PREAPERTURA_SECONDS
+            espera = max(espera, Config.RECOLECCION_INTERVAL_SECONDS)
+            return min(espera, Config.RECOLECCION_MAX_INTERVAL_SECONDS)
+
+        dia = ahora.date()
+        borde = timedelta(seconds=Config.MERCADO_BORDE_SECONDS)
+        cerca_de_borde = (
+            ahora - self._calendario.apertura(dia) < borde
+            or self._calendario.cierre(dia) - ahora < borde
+        )
+        if cerca_de_borde or time.time() < self._volatil_hasta:
+            return Config.RECOLECCION_RAPIDA_SECONDS
+        return Config.RECOLECCION_INTERVAL_SECONDS
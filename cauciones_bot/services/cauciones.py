@@ -1,17 +1,26 @@
-from typing import List
+import time
+from typing import List, Optional, Tuple
 
-from cauciones_bot.models import DatosCaucion, PuntoHistorial, ResultadoAnalisis
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion, ResultadoAnalisis, SaltoTasa, VistaHistorial
 from cauciones_bot.services.analytics import AnalizadorMercado
 from cauciones_bot.services.cache import CacheService
+from cauciones_bot.services.compartido import LectorSnapshot
+from cauciones_bot.services.fuentes import ScraperMultiFuente
 from cauciones_bot.services.history import HistorialService
 from cauciones_bot.services.logger import TelegramLogger
-from cauciones_bot.services.scraper import ScraperIOLWeb
+
+
+def _filtrar_moneda(datos: List[DatosCaucion], moneda: Optional[str]) -> List[DatosCaucion]:
+    if moneda is None or all(dato.moneda == moneda for dato in datos):
+        return datos
+    return [dato for dato in datos if dato.moneda == moneda]
 
 
 class ServicioCauciones:
     def __init__(
         self,
-        scraper: ScraperIOLWeb,
+        scraper: ScraperMultiFuente,
         cache: CacheService,
         historial: HistorialService,
         analizador: AnalizadorMercado,
@@ -22,24 +31,154 @@ class ServicioCauciones:
         self._historial = historial
         self._analizador = analizador
         self._logger = logger
+        self._version = 0
+        self._snapshot_cambio = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def version_historial(self) -> int:
+        return self._historial.version
 
-    def obtener_datos_mercado(self) -> List[DatosCaucion]:
-        datos_cache = self._cache.get()
-        if datos_cache:
-            return datos_cache
+    @property
+    def snapshot_cambio(self) -> bool:
+        return self._snapshot_cambio
 
-        datos = self._scraper.obtener_datos()
+    async def obtener_datos_mercado(
+        self, moneda: Optional[str] = Config.MONEDA_PRINCIPAL
+    ) -> List[DatosCaucion]:
+        return _filtrar_moneda(await self._cache.obtener(self._refrescar_datos), moneda)
+
+    async def actualizar_snapshot(
+        self, moneda: Optional[str] = Config.MONEDA_PRINCIPAL
+    ) -> List[DatosCaucion]:
+        datos = await self._cache.obtener(self._refrescar_datos, forzar=True)
+        return _filtrar_moneda(datos, moneda)
+
+    async def _refrescar_datos(self) -> List[DatosCaucion]:
+        datos, cambio = await self._scraper.obtener_snapshot()
+        self._snapshot_cambio = bool(datos) and cambio
+        if self._snapshot_cambio:
+            self._version += 1
         if datos:
-            self._cache.set(datos)
-            self._historial.agregar_punto(datos)
+            # Aunque la tabla no haya cambiado: agregar_punto descarta lo que cae
+            # dentro de HISTORY_MIN_INTERVAL_SECONDS, y un cambio descartado así
+            # tiene que quedar en el próximo punto. El historial es de una sola
+            # moneda; con varias fuentes queda la mejor tasa de cada plazo.
+            self._historial.agregar_punto(_filtrar_moneda(datos, Config.MONEDA_PRINCIPAL))
         return datos
 
-    def analizar_mercado(self, tasa_objetivo: float) -> ResultadoAnalisis:
-        datos = self.obtener_datos_mercado()
+    async def analizar_mercado(self, tasa_objetivo: float) -> ResultadoAnalisis:
+        datos = await self.obtener_datos_mercado()
         return self._analizador.analizar(datos, tasa_objetivo)
 
-    def obtener_historial(self) -> List[PuntoHistorial]:
-        return self._historial.obtener_historial()
+    def obtener_historial(
+        self, dias: Optional[int] = None, plazo: Optional[int] = None
+    ) -> VistaHistorial:
+        return self._historial.obtener_historial(dias, plazo)
+
+    async def cerrar(self) -> None:
+        await self._scraper.cerrar()
+        self._historial.cerrar()
+
+    def saltos(self) -> Tuple[SaltoTasa, ...]:
+        return self._historial.estadisticas.saltos
+
+    def tiene_datos_para_grafico(self) -> bool:
+        return self._historial.tiene_datos_suficientes()
+
+
+class ServicioCaucionesCompartido:
+    """Servicio del worker: lee el snapshot que publica el colector en vez de scrapear.
+
+    Expone la misma interfaz que ServicioCauciones para que BotHandlers no
+    distinga el modo de despliegue.
+    """
+
+    def __init__(
+        self,
+        lector: LectorSnapshot,
+        historial: HistorialService,
+        analizador: AnalizadorMercado,
+        max_edad_seconds: int = Config.SNAPSHOT_MAX_EDAD_SECONDS,
+    ) -> None:
+        self._lector = lector
+        self._historial = historial
+        self._analizador = analizador
+        self._max_edad = max_edad_seconds
+        self._version = 0
+        self._version_historial_remota = 0
+        self._datos: List[DatosCaucion] = []
+        self._snapshot_cambio = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def version_historial(self) -> int:
+        self._sincronizar_historial(self._lector.version_historial())
+        return self._historial.version
+
+    @property
+    def snapshot_cambio(self) -> bool:
+        return self._snapshot_cambio
+
+    # El colector publica solo la moneda principal.
+    async def obtener_datos_mercado(
+        self, moneda: Optional[str] = Config.MONEDA_PRINCIPAL
+    ) -> List[DatosCaucion]:
+        return _filtrar_moneda(self._leer(), moneda)
+
+    async def actualizar_snapshot(
+        self, moneda: Optional[str] = Config.MONEDA_PRINCIPAL
+    ) -> List[DatosCaucion]:
+        return _filtrar_moneda(self._leer(), moneda)
+
+    def _leer(self) -> List[DatosCaucion]:
+        snapshot = self._lector.leer()
+        if snapshot is None:
+            # Escritura en curso o colector aún no arrancó: se sirve lo último leído.
+            self._snapshot_cambio = False
+            return self._datos
+        if time.time() - snapshot.publicado > self._max_edad:
+            # Colector caído o reiniciado (segmento nuevo): se reengancha en la próxima lectura.
+            self._lector.cerrar()
+            self._snapshot_cambio = False
+            return []
+
+        self._snapshot_cambio = snapshot.version != self._version
+        if self._snapshot_cambio:
+            self._version = snapshot.version
+            self._datos = snapshot.datos
+        self._sincronizar_historial(snapshot.version_historial)
+        return self._datos
+
+    def _sincronizar_historial(self, version_remota: Optional[int]) -> None:
+        # Los gráficos también sincronizan: en los workers que no envían alertas
+        # nadie más llama a _leer() y el historial quedaría el del arranque.
+        if version_remota is not None and version_remota != self._version_historial_remota:
+            self._version_historial_remota = version_remota
+            self._historial.sincronizar()
+
+    async def analizar_mercado(self, tasa_objetivo: float) -> ResultadoAnalisis:
+        return self._analizador.analizar(self._leer(), tasa_objetivo)
+
+    def obtener_historial(
+        self, dias: Optional[int] = None, plazo: Optional[int] = None
+    ) -> VistaHistorial:
+        self._sincronizar_historial(self._lector.version_historial())
+        return self._historial.obtener_historial(dias, plazo)
+
+    async def cerrar(self) -> None:
+        self._lector.cerrar()
+        self._historial.cerrar()
+
+    def saltos(self) -> Tuple[SaltoTasa, ...]:
+        return self._historial.estadisticas.saltos
 
     def tiene_datos_para_grafico(self) -> bool:
+        self._sincronizar_historial(self._lector.version_historial())
         return self._historial.tiene_datos_suficientes()
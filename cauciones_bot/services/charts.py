@@ -1,104 +1,100 @@
 import logging
 from io import BytesIO
-from typing import List, Optional
+from typing import Optional
 
-import matplotlib
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+import numpy as np
 import pytz
+from matplotlib.figure import Figure
 
-from cauciones_bot.models import PuntoHistorial
+from cauciones_bot.config import Config
+from cauciones_bot.models import VistaHistorial
+from cauciones_bot.services.serie import AGG_MAX, calcular_agregados, mascaras_tramos
 
-matplotlib.use("Agg")
+ESTILOS_TRAMOS = (
+    ("o", "-", "#2ca02c"),
+    ("s", "--", "#1f77b4"),
+    ("^", ":", "#ff7f0e"),
+    ("D", "-.", "#d62728"),
+)
 
 
 class GeneradorGraficos:
     @staticmethod
-    def _configurar_ejes(ax, titulo: str) -> None:
+    def _configurar_ejes(ax, titulo: str, historial: Optional[VistaHistorial] = None) -> None:
         tz_ar = pytz.timezone("America/Argentina/Buenos_Aires")
+        span = int(historial.ts[-1] - historial.ts[0]) if historial is not None else 0
+        if span > 7 * 86400:
+            etiqueta, formato = "Fecha (Argentina)", "%d/%m"
+        elif span > 86400:
+            etiqueta, formato = "Fecha (Argentina)", "%d/%m %H:%M"
+        else:
+            etiqueta, formato = "Hora (Argentina)", "%H:%M"
 
         ax.set_title(titulo)
-        ax.set_xlabel("Hora (Argentina)")
+        ax.set_xlabel(etiqueta)
         ax.set_ylabel("Tasa TNA (%)")
         ax.grid(True, linestyle="--", alpha=0.5)
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M", tz=tz_ar))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(formato, tz=tz_ar))
 
     @staticmethod
-    def generar_tendencia_general(historial: List[PuntoHistorial]) -> Optional[BytesIO]:
-        if not historial or len(historial) < 2:
+    def _exportar_png(fig: Figure) -> bytes:
+        # API orientada a objetos: sin estado global de pyplot, apta para workers.
+        buf = BytesIO()
+        fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+        return buf.getvalue()
+
+    @staticmethod
+    def generar_tendencia_general(historial: VistaHistorial) -> Optional[bytes]:
+        if len(historial) < 2:
             return None
         try:
-            x = [punto.hora for punto in historial]
-            y_corto, y_medio, y_largo = [], [], []
-
-            for punto in historial:
-                tasas = punto.tasas_por_plazo
-                tc = [t for d, t in tasas.items() if 1 <= d <= 7]
-                y_corto.append(max(tc) if tc else None)
-                tm = [t for d, t in tasas.items() if 8 <= d <= 30]
-                y_medio.append(max(tm) if tm else None)
-                tl = [t for d, t in tasas.items() if d > 30]
-                y_largo.append(max(tl) if tl else None)
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.plot(
-                x,
-                y_corto,
-                marker="o",
-                markersize=4,
-                linestyle="-",
-                color="#2ca02c",
-                label="Corto (1-7d)",
-            )
-            ax.plot(
-                x,
-                y_medio,
-                marker="s",
-                markersize=4,
-                linestyle="--",
-                color="#1f77b4",
-                label="Medio (8-30d)",
-            )
-            ax.plot(
-                x,
-                y_largo,
-                marker="^",
-                markersize=4,
-                linestyle=":",
-                color="#ff7f0e",
-                label="Largo (>30d)",
-            )
+            x = historial.horas()
+            agregados = historial.agregados
+            if agregados is None:
+                agregados = calcular_agregados(historial.tasas, mascaras_tramos(historial.plazos))
+
+            fig = Figure(figsize=(10, 6))
+            ax = fig.subplots()
+            for i, (nombre, minimo, maximo) in enumerate(Config.TRAMOS_PLAZO):
+                marker, linestyle, color = ESTILOS_TRAMOS[i % len(ESTILOS_TRAMOS)]
+                rango = f"{minimo}-{maximo}d" if maximo is not None else f">{minimo - 1}d"
+                ax.plot(
+                    x,
+                    agregados[:, i, AGG_MAX],
+                    marker=marker,
+                    markersize=4,
+                    linestyle=linestyle,
+                    color=color,
+                    label=f"{nombre} ({rango})",
+                )
 
-            GeneradorGraficos._configurar_ejes(ax, "Tendencia de Mercado (3 Plazos)")
+            GeneradorGraficos._configurar_ejes(
+                ax, f"Tendencia de Mercado ({len(Config.TRAMOS_PLAZO)} Plazos)", historial
+            )
             fig.autofmt_xdate()
             ax.legend(loc="best")
 
-            buf = BytesIO()
-            plt.savefig(buf, format="png", dpi=100, bbox_inches="tight")
-            buf.seek(0)
-            plt.close(fig)
-            return buf
+            return GeneradorGraficos._exportar_png(fig)
         except Exception as exc:
             logging.error("Error gráfico general: %s", exc)
             return None
 
     @staticmethod
     def generar_tendencia_custom(
-        historial: List[PuntoHistorial], dias_objetivo: int
-    ) -> Optional[BytesIO]:
-        if not historial or len(historial) < 2:
+        historial: VistaHistorial, dias_objetivo: int
+    ) -> Optional[bytes]:
+        if len(historial) < 2:
             return None
         try:
-            x, y = [], []
-            for punto in historial:
-                x.append(punto.hora)
-                val = punto.tasas_por_plazo.get(dias_objetivo, None)
-                y.append(val)
+            x = historial.horas()
+            y = historial.columna(dias_objetivo)
 
-            if all(v is None for v in y):
+            if np.isnan(y).all():
                 return None
 
-            fig, ax = plt.subplots(figsize=(10, 5))
+            fig = Figure(figsize=(10, 5))
+            ax = fig.subplots()
             ax.plot(
                 x,
                 y,
@@ -108,18 +104,23 @@ class GeneradorGraficos:
                 color="#9467bd",
                 label=f"Plazo {dias_objetivo}d",
             )
+            if historial.maximos is not None and historial.minimos is not None:
+                ax.fill_between(
+                    x,
+                    historial.columna(dias_objetivo, historial.minimos),
+                    historial.columna(dias_objetivo, historial.maximos),
+                    color="#9467bd",
+                    alpha=0.2,
+                    label=f"Rango ({historial.resolucion // 3600}h)",
+                )
 
             GeneradorGraficos._configurar_ejes(
-                ax, f"Tendencia Personalizada: {dias_objetivo} Días"
+                ax, f"Tendencia Personalizada: {dias_objetivo} Días", historial
             )
             fig.autofmt_xdate()
             ax.legend()
 
-            buf = BytesIO()
-            plt.savefig(buf, format="png", dpi=100, bbox_inches="tight")
-            buf.seek(0)
-            plt.close(fig)
-            return buf
+            return GeneradorGraficos._exportar_png(fig)
         except Exception as exc:
             logging.error("Error gráfico custom: %s", exc)
             return None
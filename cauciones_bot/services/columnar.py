@@ -0,0 +1,152 @@
+"""Historial en formato columnar (Arrow IPC o Parquet) para backfills y notebooks.
+
+Usa pyarrow, que es opcional: el bot no lo necesita para funcionar. El formato
+es largo, una fila por (ts, plazo, tasa), y sale por la extensión del archivo:
+.parquet es Parquet y cualquier otra es Arrow IPC (.arrow / .feather).
+"""
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import VistaHistorial
+from cauciones_bot.services.almacen import AlmacenHistorial
+from cauciones_bot.services.serie import calcular_agregados, mascaras_tramos
+
+Columnas = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise RuntimeError("El volcado de historial requiere pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def _es_parquet(ruta: str) -> bool:
+    return Path(ruta).suffix.lower() == ".parquet"
+
+
+def _esquema():
+    pa = _pyarrow()
+    return pa.schema([("ts", pa.int64()), ("plazo", pa.int32()), ("tasa", pa.float64())])
+
+
+def exportar(
+    almacen: AlmacenHistorial,
+    ruta: str,
+    desde: int = 0,
+    hasta: Optional[int] = None,
+    lote: int = Config.VOLCADO_LOTE_FILAS,
+) -> int:
+    pa = _pyarrow()
+    esquema = _esquema()
+    if _es_parquet(ruta):
+        import pyarrow.parquet as pq
+
+        escritor = pq.ParquetWriter(ruta, esquema)
+    else:
+        import pyarrow.ipc as ipc
+
+        escritor = ipc.new_file(ruta, esquema)
+
+    filas = 0
+    with escritor:
+        for ts, plazos, tasas in almacen.iterar_lotes(desde, hasta, lote):
+            escritor.write_batch(pa.record_batch([ts, plazos, tasas], schema=esquema))
+            filas += len(ts)
+    return filas
+
+
+def iterar_lotes(ruta: str, lote: int = Config.VOLCADO_LOTE_FILAS) -> Iterator[Columnas]:
+    """Recorre el archivo de a lotes.
+
+    En Arrow IPC los arreglos son vistas sobre el mmap, sin copias: valen
+    mientras se itera y hay que copiar lo que se quiera conservar.
+    """
+    pa = _pyarrow()
+    if _es_parquet(ruta):
+        import pyarrow.parquet as pq
+
+        lotes = pq.ParquetFile(ruta, memory_map=True).iter_batches(batch_size=lote)
+        for batch in lotes:
+            yield _columnas(batch)
+        return
+
+    import pyarrow.ipc as ipc
+
+    with pa.memory_map(ruta) as fuente:
+        lector = ipc.open_file(fuente)
+        for i in range(lector.num_record_batches):
+            yield _columnas(lector.get_batch(i))
+
+
+def _columnas(batch) -> Columnas:
+    # Los tipos ya son los del esquema (plazo int32): sin astype no hay copias.
+    return tuple(
+        batch.column(nombre).to_numpy(zero_copy_only=False) for nombre in ("ts", "plazo", "tasa")
+    )
+
+
+def _lotes_parquet_filtrados(
+    ruta: str, desde: int, hasta: int, plazo: Optional[int]
+) -> Iterator[Columnas]:
+    # Con filtros pyarrow descarta los row groups cuyas estadísticas de ts o
+    # plazo quedan fuera del pedido: no se decodifica el archivo entero.
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    filtros = [("ts", ">=", desde), ("ts", "<=", hasta)]
+    if plazo is not None:
+        filtros.append(("plazo", "==", plazo))
+    tabla = pq.read_table(ruta, columns=["ts", "plazo", "tasa"], filters=filtros, memory_map=True)
+    for batch in tabla.to_batches():
+        yield _columnas(batch)
+
+
+def importar(
+    almacen: AlmacenHistorial, ruta: str, lote: int = Config.VOLCADO_LOTE_FILAS
+) -> Tuple[int, Optional[Tuple[int, int]]]:
+    """Devuelve las filas importadas y el rango de ts que cubren."""
+    filas, desde, hasta = 0, None, None
+    for ts, plazos, tasas in iterar_lotes(ruta, lote):
+        if not len(ts):
+            continue
+        filas += almacen.importar(ts, plazos, tasas)
+        minimo, maximo = int(ts.min()), int(ts.max())
+        desde = minimo if desde is None else min(desde, minimo)
+        hasta = maximo if hasta is None else max(hasta, maximo)
+    return filas, (desde, hasta) if desde is not None else None
+
+
+def leer_vista(
+    ruta: str,
+    desde: int = 0,
+    hasta: Optional[int] = None,
+    plazo: Optional[int] = None,
+) -> VistaHistorial:
+    """Arma la matriz (ts × plazo) solo con las filas pedidas, sin cargar el archivo entero."""
+    hasta = hasta if hasta is not None else 2**62
+    if _es_parquet(ruta):
+        lotes = _lotes_parquet_filtrados(ruta, desde, hasta, plazo)
+    else:
+        lotes = iterar_lotes(ruta)
+    partes = []
+    for ts, plazos, tasas in lotes:
+        mascara = (ts >= desde) & (ts <= hasta)
+        if plazo is not None:
+            mascara &= plazos == plazo
+        if mascara.any():
+            partes.append((ts[mascara], plazos[mascara], tasas[mascara]))
+    if not partes:
+        return VistaHistorial.vacia()
+
+    ts, plazos, tasas = (np.concatenate(columna) for columna in zip(*partes))
+    ts_unicos, fila_idx = np.unique(ts, return_inverse=True)
+    plazos_unicos, col_idx = np.unique(plazos, return_inverse=True)
+    matriz = np.full((len(ts_unicos), len(plazos_unicos)), np.nan)
+    matriz[fila_idx, col_idx] = tasas
+    agregados = calcular_agregados(matriz, mascaras_tramos(plazos_unicos))
+    return VistaHistorial(ts_unicos, plazos_unicos, matriz, agregados)
@@ -0,0 +1,153 @@
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion
+
+# Cabecera int64: secuencia (seqlock), versión del snapshot, versión del
+# historial, filas válidas y timestamp de publicación en ms.
+_SEQ, _VERSION, _VERSION_HISTORIAL, _FILAS, _TS_MS = range(5)
+_CAMPOS_CABECERA = 5
+
+
+def _tamano(max_filas: int) -> int:
+    return 8 * (_CAMPOS_CABECERA + 2 * max_filas)
+
+
+@dataclass(frozen=True)
+class SnapshotCompartido:
+    version: int
+    version_historial: int
+    publicado: float
+    datos: List[DatosCaucion]
+
+
+class _Segmento:
+    def __init__(self, memoria: SharedMemory, max_filas: int) -> None:
+        self._memoria = memoria
+        buffer = memoria.buf
+        self._cabecera = np.ndarray((_CAMPOS_CABECERA,), dtype=np.int64, buffer=buffer)
+        offset = 8 * _CAMPOS_CABECERA
+        self._dias = np.ndarray((max_filas,), dtype=np.int64, buffer=buffer, offset=offset)
+        self._tasas = np.ndarray(
+            (max_filas,), dtype=np.float64, buffer=buffer, offset=offset + 8 * max_filas
+        )
+
+    def _soltar(self) -> None:
+        # Las vistas numpy retienen el buffer: hay que soltarlas antes de close().
+        del self._cabecera, self._dias, self._tasas
+        self._memoria.close()
+
+
+class PublicadorSnapshot(_Segmento):
+    """Lado colector: único escritor del segmento."""
+
+    def __init__(
+        self,
+        nombre: str = Config.SNAPSHOT_SHM_NOMBRE,
+        max_filas: int = Config.SNAPSHOT_MAX_FILAS,
+    ) -> None:
+        try:
+            memoria = SharedMemory(nombre, create=True, size=_tamano(max_filas))
+        except FileExistsError:
+            # Segmento huérfano de un colector que murió sin limpiar.
+            viejo = SharedMemory(nombre)
+            viejo.close()
+            viejo.unlink()
+            memoria = SharedMemory(nombre, create=True, size=_tamano(max_filas))
+        super().__init__(memoria, max_filas)
+        self._cabecera[:] = 0
+        self._max_filas = max_filas
+
+    def publicar(
+        self, datos: List[DatosCaucion], version: int, version_historial: int
+    ) -> None:
+        n = min(len(datos), self._max_filas)
+        cabecera = self._cabecera
+        # Seqlock: secuencia impar = escritura en curso; el lector reintenta.
+        cabecera[_SEQ] += 1
+        self._dias[:n] = [dato.dias for dato in datos[:n]]
+        self._tasas[:n] = [dato.tasa for dato in datos[:n]]
+        cabecera[_VERSION] = version
+        cabecera[_VERSION_HISTORIAL] = version_historial
+        cabecera[_FILAS] = n
+        cabecera[_TS_MS] = int(time.time() * 1000)
+        cabecera[_SEQ] += 1
+
+    def cerrar(self) -> None:
+        memoria = self._memoria
+        self._soltar()
+        memoria.unlink()
+
+
+class LectorSnapshot:
+    """Lado worker: se engancha al segmento cuando el colector lo crea."""
+
+    def __init__(
+        self,
+        nombre: str = Config.SNAPSHOT_SHM_NOMBRE,
+        max_filas: int = Config.SNAPSHOT_MAX_FILAS,
+        reintentos: int = 100,
+    ) -> None:
+        self._nombre = nombre
+        self._max_filas = max_filas
+        self._reintentos = reintentos
+        self._segmento: Optional[_Segmento] = None
+
+    def _conectar(self) -> Optional[_Segmento]:
+        if self._segmento is None:
+            try:
+                memoria = SharedMemory(self._nombre)
+            except FileNotFoundError:
+                return None
+            # Antes de 3.13 el resource_tracker borraría el segmento al salir
+            # el worker, aunque sea del colector.
+            nombre_interno = memoria._name  # type: ignore[attr-defined]
+            resource_tracker.unregister(nombre_interno, "shared_memory")
+            self._segmento = _Segmento(memoria, self._max_filas)
+        return self._segmento
+
+    def leer(self) -> Optional[SnapshotCompartido]:
+        segmento = self._conectar()
+        if segmento is None:
+            return None
+        cabecera = segmento._cabecera
+        for _ in range(self._reintentos):
+            secuencia = int(cabecera[_SEQ])
+            if secuencia == 0:
+                return None
+            if secuencia % 2:
+                time.sleep(0)
+                continue
+            n = int(cabecera[_FILAS])
+            version = int(cabecera[_VERSION])
+            version_historial = int(cabecera[_VERSION_HISTORIAL])
+            publicado = int(cabecera[_TS_MS]) / 1000
+            # Son unos cientos de bytes: se copian dentro de la ventana del seqlock.
+            dias = segmento._dias[:n].tolist()
+            tasas = segmento._tasas[:n].tolist()
+            if int(cabecera[_SEQ]) == secuencia:
+                return SnapshotCompartido(
+                    version,
+                    version_historial,
+                    publicado,
+                    [DatosCaucion(d, t) for d, t in zip(dias, tasas)],
+                )
+        return None
+
+    def version_historial(self) -> Optional[int]:
+        """Solo ese campo de la cabecera: un int64 alineado se lee sin seqlock."""
+        segmento = self._conectar()
+        if segmento is None or not int(segmento._cabecera[_SEQ]):
+            return None
+        return int(segmento._cabecera[_VERSION_HISTORIAL])
+
+    def cerrar(self) -> None:
+        if self._segmento is not None:
+            self._segmento._soltar()
+            self._segmento = None
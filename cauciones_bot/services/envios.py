@@ -0,0 +1,198 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from cauciones_bot.config import Config
+from cauciones_bot.services.metricas import metricas
+
+
+@dataclass(order=True)
+class MensajeSaliente:
+    prioridad: int
+    secuencia: int
+    chat_id: int = field(compare=False)
+    texto: str = field(compare=False)
+    parse_mode: Optional[str] = field(default="Markdown", compare=False)
+    intentos: int = field(default=0, compare=False)
+    encolado: float = field(default_factory=time.monotonic, compare=False)
+
+
+class TokenBucket:
+    def __init__(self, tasa: float, capacidad: float) -> None:
+        self._tasa = tasa
+        self._capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+
+    def _recargar(self) -> None:
+        ahora = time.monotonic()
+        self._tokens = min(self._capacidad, self._tokens + (ahora - self._ultimo) * self._tasa)
+        self._ultimo = ahora
+
+    @property
+    def lleno(self) -> bool:
+        self._recargar()
+        return self._tokens >= self._capacidad
+
+    def intentar(self) -> float:
+        self._recargar()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._tasa
+
+    async def adquirir(self) -> None:
+        while True:
+            espera = self.intentar()
+            if not espera:
+                return
+            await asyncio.sleep(espera)
+
+
+class ColaEnvios:
+    PRIORIDAD_CRITICA = 0
+    PRIORIDAD_NORMAL = 1
+
+    def __init__(
+        self,
+        al_bloquear: Callable[[int], object],
+        workers: int = Config.ENVIOS_WORKERS,
+        tasa_global: float = Config.ENVIOS_TASA_GLOBAL,
+        tasa_por_chat: float = Config.ENVIOS_TASA_POR_CHAT,
+        max_reintentos: int = Config.ENVIOS_MAX_REINTENTOS,
+    ) -> None:
+        self._al_bloquear = al_bloquear
+        self._n_workers = workers
+        self._bucket_global = TokenBucket(tasa_global, tasa_global)
+        self._tasa_por_chat = tasa_por_chat
+        self._buckets_chat: Dict[int, TokenBucket] = {}
+        self._max_reintentos = max_reintentos
+        self._cola: "asyncio.PriorityQueue[MensajeSaliente]" = asyncio.PriorityQueue()
+        self._secuencia = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._bot: Optional[Bot] = None
+        self._pausa_hasta = 0.0
+        self._enviados = 0
+        self._fallidos = 0
+        self._reintentos = 0
+        self._bloqueados = 0
+        self._latencia_total = 0.0
+        self._latencia_max = 0.0
+
+    def iniciar(self, bot: Bot) -> None:
+        self._bot = bot
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"envios-{i}")
+                for i in range(self._n_workers)
+            ]
+
+    async def detener(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def encolar(self, chat_id: int, texto: str, critica: bool = False) -> None:
+        prioridad = self.PRIORIDAD_CRITICA if critica else self.PRIORIDAD_NORMAL
+        self._cola.put_nowait(
+            MensajeSaliente(prioridad, next(self._secuencia), chat_id, texto)
+        )
+
+    def metricas(self) -> Dict[str, float]:
+        return {
+            "profundidad": self._cola.qsize(),
+            "enviados": self._enviados,
+            "fallidos": self._fallidos,
+            "reintentos": self._reintentos,
+            "bloqueados": self._bloqueados,
+            "latencia_media_s": self._latencia_total / self._enviados if self._enviados else 0.0,
+            "latencia_max_s": self._latencia_max,
+        }
+
+    def _reencolar(self, msg: MensajeSaliente, demora: float) -> None:
+        asyncio.get_running_loop().call_later(demora, self._cola.put_nowait, msg)
+
+    async def _worker(self) -> None:
+        while True:
+            msg = await self._cola.get()
+            try:
+                await self._procesar(msg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._fallidos += 1
+                logging.error("❌ Envío a %s falló: %s", msg.chat_id, exc)
+            finally:
+                self._cola.task_done()
+
+    async def _procesar(self, msg: MensajeSaliente) -> None:
+        pausa = self._pausa_hasta - time.monotonic()
+        if pausa > 0:
+            await asyncio.sleep(pausa)
+
+        bucket = self._buckets_chat.get(msg.chat_id)
+        if bucket is None:
+            bucket = self._buckets_chat[msg.chat_id] = TokenBucket(self._tasa_por_chat, 1)
+        espera = bucket.intentar()
+        if espera:
+            # No bloquear al worker por un chat saturado: vuelve a la cola luego.
+            self._reencolar(msg, espera)
+            return
+
+        await self._bucket_global.adquirir()
+        try:
+            with metricas.cronometro("envio"):
+                await self._bot.send_message(msg.chat_id, msg.texto, parse_mode=msg.parse_mode)
+        except RetryAfter as exc:
+            # Flood control no es un fallo del mensaje: vuelve a la cola sin
+            # gastar intentos, que quedan para los errores de red.
+            self._pausa_hasta = time.monotonic() + float(exc.retry_after)
+            self._reintentos += 1
+            self._reencolar(msg, float(exc.retry_after))
+            return
+        except Forbidden:
+            self._bloquear(msg.chat_id)
+            return
+        except BadRequest as exc:
+            if "chat not found" in str(exc).lower():
+                self._bloquear(msg.chat_id)
+                return
+            raise
+        except NetworkError:
+            self._reintentar(msg, 2.0 ** msg.intentos)
+            return
+
+        latencia = time.monotonic() - msg.encolado
+        self._enviados += 1
+        self._latencia_total += latencia
+        self._latencia_max = max(self._latencia_max, latencia)
+        if len(self._buckets_chat) > Config.ENVIOS_MAX_BUCKETS_CHAT:
+            self._podar_buckets()
+
+    def _reintentar(self, msg: MensajeSaliente, demora: float) -> None:
+        msg.intentos += 1
+        if msg.intentos > self._max_reintentos:
+            self._fallidos += 1
+            logging.warning(
+                "⚠️ Mensaje a %s descartado tras %s intentos.", msg.chat_id, msg.intentos
+            )
+            return
+        self._reintentos += 1
+        self._reencolar(msg, demora)
+
+    def _bloquear(self, chat_id: int) -> None:
+        self._bloqueados += 1
+        self._buckets_chat.pop(chat_id, None)
+        self._al_bloquear(chat_id)
+        logging.info("🚫 Chat %s bloqueó al bot: alertas canceladas.", chat_id)
+
+    def _podar_buckets(self) -> None:
+        for chat_id in [c for c, b in self._buckets_chat.items() if b.lleno]:
+            del self._buckets_chat[chat_id]
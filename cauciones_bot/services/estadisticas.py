@@ -0,0 +1,111 @@
+import math
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import SaltoTasa, VistaHistorial
+
+
+class EstadisticasPlazo:
+    """EWMA, volatilidad exponencial, z-score y rango intradiario de un plazo.
+
+    Cada punto nuevo actualiza todo en O(1), sin recorrer el historial.
+    """
+
+    __slots__ = ("puntos", "ultima", "ewma", "varianza", "zscore", "dia", "minimo", "maximo")
+
+    def __init__(self) -> None:
+        self.puntos = 0
+        self.ultima = math.nan
+        self.ewma = math.nan
+        self.varianza = 0.0
+        self.zscore: Optional[float] = None
+        self.dia = -1
+        self.minimo = math.nan
+        self.maximo = math.nan
+
+    @property
+    def volatilidad(self) -> float:
+        return math.sqrt(self.varianza)
+
+    def actualizar(self, tasa: float, dia: int, alpha: float, min_puntos: int) -> None:
+        if dia != self.dia:
+            self.dia, self.minimo, self.maximo = dia, tasa, tasa
+        elif tasa < self.minimo:
+            self.minimo = tasa
+        elif tasa > self.maximo:
+            self.maximo = tasa
+
+        if self.puntos == 0:
+            self.ewma = tasa
+        else:
+            desvio = tasa - self.ewma
+            # El z-score compara contra la media y volatilidad previas al punto:
+            # si no, el propio salto infla la volatilidad con la que se mide.
+            if self.puntos >= min_puntos:
+                volatilidad = max(self.volatilidad, Config.ESTADISTICAS_MIN_VOLATILIDAD)
+                self.zscore = desvio / volatilidad
+            incremento = alpha * desvio
+            self.ewma += incremento
+            self.varianza = (1 - alpha) * (self.varianza + desvio * incremento)
+        self.puntos += 1
+        self.ultima = tasa
+
+
+class EstadisticasStreaming:
+    """Estadísticas por plazo alimentadas por cada punto que entra al historial."""
+
+    def __init__(
+        self,
+        alpha: float = Config.ESTADISTICAS_ALPHA,
+        min_puntos: int = Config.ESTADISTICAS_MIN_PUNTOS,
+        sigma_minimo: float = Config.ESTADISTICAS_SIGMA_MINIMO,
+        max_plazo_saltos: int = Config.MAX_DIAS_TOP3,
+    ) -> None:
+        self._alpha = alpha
+        self._min_puntos = min_puntos
+        self._sigma_minimo = sigma_minimo
+        self._max_plazo_saltos = max_plazo_saltos
+        self._plazos: Dict[int, EstadisticasPlazo] = {}
+        self._saltos: Tuple[SaltoTasa, ...] = ()
+
+    def __len__(self) -> int:
+        return len(self._plazos)
+
+    def obtener(self, plazo: int) -> Optional[EstadisticasPlazo]:
+        return self._plazos.get(plazo)
+
+    @property
+    def saltos(self) -> Tuple[SaltoTasa, ...]:
+        """Saltos del último punto, de mayor a menor |z|."""
+        return self._saltos
+
+    def actualizar(self, ts: int, mapa_tasas: Mapping[int, float]) -> None:
+        dia = (ts + Config.TZ_OFFSET_SECONDS) // 86400
+        saltos = []
+        for plazo, tasa in mapa_tasas.items():
+            estadisticas = self._plazos.get(plazo)
+            if estadisticas is None:
+                estadisticas = self._plazos[plazo] = EstadisticasPlazo()
+            ewma = estadisticas.ewma
+            estadisticas.actualizar(tasa, dia, self._alpha, self._min_puntos)
+            zscore = estadisticas.zscore
+            if (
+                zscore is not None
+                and abs(zscore) >= self._sigma_minimo
+                and plazo <= self._max_plazo_saltos
+            ):
+                saltos.append(
+                    SaltoTasa(
+                        ts, plazo, tasa, ewma, zscore, estadisticas.minimo, estadisticas.maximo
+                    )
+                )
+        saltos.sort(key=lambda salto: -abs(salto.zscore))
+        self._saltos = tuple(saltos)
+
+    def cargar(self, vista: VistaHistorial) -> None:
+        plazos = np.asarray(vista.plazos)
+        for ts, fila in zip(vista.ts.tolist(), vista.tasas):
+            validos = ~np.isnan(fila)
+            self.actualizar(ts, dict(zip(plazos[validos].tolist(), fila[validos].tolist())))
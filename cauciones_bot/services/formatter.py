@@ -1,41 +1,123 @@
-from cauciones_bot.models import ResultadoAnalisis
+from typing import Dict, Optional, Sequence, Tuple
+
+from cauciones_bot.models import ResultadoAnalisis, SaltoTasa
+
+ClaveMemo = Tuple[str, Optional[float]]
 
 
 class FormateadorMensajes:
-    @staticmethod
-    def formatear_reporte_completo(analisis: ResultadoAnalisis, tasa_objetivo: float) -> str:
+    """Arma los reportes en Markdown.
+
+    Con `version` (la del snapshot analizado) el texto se memoriza por
+    (tipo de reporte, tasa objetivo): todos los suscriptores con el mismo
+    umbral comparten el mismo string, y el Top 3 se arma una vez por snapshot.
+    """
+
+    def __init__(self) -> None:
+        self._version: Optional[int] = None
+        self._memo: Dict[ClaveMemo, str] = {}
+
+    def _buscar(self, version: Optional[int], clave: ClaveMemo) -> Optional[str]:
+        if version is None:
+            return None
+        if version != self._version:
+            self._version = version
+            self._memo.clear()
+        return self._memo.get(clave)
+
+    def _guardar(self, version: Optional[int], clave: ClaveMemo, texto: str) -> str:
+        if version is not None:
+            self._memo[clave] = texto
+        return texto
+
+    def _top_3(self, analisis: ResultadoAnalisis, version: Optional[int], tipo: str) -> str:
+        clave = (tipo, None)
+        texto = self._buscar(version, clave)
+        if texto is None:
+            if tipo == "top_completo":
+                lineas = [f"✅ *{item.tasa}%* a {item.dias} DÍAS\n" for item in analisis.top_3]
+            else:
+                lineas = [f"• {item.tasa}% ({item.dias} DÍAS)\n" for item in analisis.top_3]
+            texto = self._guardar(version, clave, "".join(lineas))
+        return texto
+
+    def formatear_reporte_completo(
+        self, analisis: ResultadoAnalisis, tasa_objetivo: float, version: Optional[int] = None
+    ) -> str:
+        clave = ("completo", tasa_objetivo)
+        texto = self._buscar(version, clave)
+        if texto is not None:
+            return texto
+
         mensajes = []
         if analisis.hay_alerta_critica:
             mensajes.append(f"🚨🚨 *SUPER ALERTA: {analisis.tasa_maxima}% TNA* 🚨🚨")
 
-        msg_top = "*🏆 Top 3 Mercado (hasta 60 días):*\n\n"
-        for item in analisis.top_3:
-            msg_top += f"✅ *{item.tasa}%* a {item.dias} DÍAS\n"
-        mensajes.append(msg_top)
+        mensajes.append(
+            "*🏆 Top 3 Mercado (hasta 60 días):*\n\n"
+            + self._top_3(analisis, version, "top_completo")
+        )
 
         if analisis.oportunidades:
-            msg_ops = f"\n🔔 *Tus Oportunidades (> {tasa_objetivo}%):*\n\n"
-            for item in analisis.oportunidades[:5]:
-                msg_ops += f"✅ *{item.dias} DÍAS* | Tasa: {item.tasa}%\n"
-            mensajes.append(msg_ops)
-
-        return "\n".join(mensajes)
+            lineas = [f"\n🔔 *Tus Oportunidades (> {tasa_objetivo}%):*\n\n"]
+            lineas += [
+                f"✅ *{item.dias} DÍAS* | Tasa: {item.tasa}%\n"
+                for item in analisis.oportunidades[:5]
+            ]
+            mensajes.append("".join(lineas))
 
-    @staticmethod
-    def formatear_reporte_manual(analisis: ResultadoAnalisis, tasa_objetivo: float) -> str:
-        msg = (
-            f"🔎 *REPORTE MANUAL* (Obj: {tasa_objetivo}%)\n\n"
-            "*🏆 Top 3 Global:*\n\n"
-        )
-        for item in analisis.top_3:
-            msg += f"• {item.tasa}% ({item.dias} DÍAS)\n"
+        return self._guardar(version, clave, "\n".join(mensajes))
 
-        msg += "\n*✅ Oportunidades:*\n\n"
+    def formatear_reporte_manual(
+        self, analisis: ResultadoAnalisis, tasa_objetivo: float, version: Optional[int] = None
+    ) -> str:
+        clave = ("manual", tasa_objetivo)
+        texto = self._buscar(version, clave)
+        if texto is not None:
+            return texto
 
+        partes = [
+            f"🔎 *REPORTE MANUAL* (Obj: {tasa_objetivo}%)\n\n",
+            "*🏆 Top 3 Global:*\n\n",
+            self._top_3(analisis, version, "top_manual"),
+            "\n*✅ Oportunidades:*\n\n",
+        ]
         if analisis.oportunidades:
-            for item in analisis.oportunidades[:5]:
-                msg += f"• {item.tasa}% ({item.dias} DÍAS)\n"
+            partes += [
+                f"• {item.tasa}% ({item.dias} DÍAS)\n" for item in analisis.oportunidades[:5]
+            ]
         else:
-            msg += "Nada supera tu objetivo hoy."
+            partes.append("Nada supera tu objetivo hoy.")
 
-        return msg
+        return self._guardar(version, clave, "".join(partes))
+
+    def formatear_saltos(
+        self, saltos: Sequence[SaltoTasa], sigma: float, version: Optional[int] = None
+    ) -> str:
+        # Para un mismo punto, quienes tienen el mismo sigma reciben los mismos saltos.
+        clave = ("saltos", sigma)
+        texto = self._buscar(version, clave)
+        if texto is not None:
+            return texto
+
+        lineas = [f"📈 *Salto de tasa (≥ {sigma:g}σ):*\n\n"]
+        lineas += [
+            f"{'🔺' if s.zscore > 0 else '🔻'} *{s.plazo} DÍAS*: {s.tasa}% "
+            f"({s.zscore:+.1f}σ, media {s.ewma:.2f}%)\n"
+            f"    Hoy: {s.minimo:.2f}% – {s.maximo:.2f}%\n"
+            for s in saltos
+        ]
+        return self._guardar(version, clave, "".join(lineas))
+
+    @staticmethod
+    def formatear_estadisticas(resumen: Dict[str, Dict]) -> str:
+        lineas = ["📈 *Estadísticas*\n", "*⏱️ Tiempos (n · media · máx):*"]
+        for nombre, t in resumen["tiempos"].items():
+            lineas.append(
+                f"• {nombre}: {t['n']} · {t['media_ms']:.2f} ms · {t['max_ms']:.2f} ms"
+            )
+        lineas.append("\n*🔢 Contadores:*")
+        lineas += [f"• {nombre}: {valor:g}" for nombre, valor in resumen["contadores"].items()]
+        lineas.append("\n*📊 Estado:*")
+        lineas += [f"• {nombre}: {valor:g}" for nombre, valor in resumen["gauges"].items()]
+        return "\n".join(lineas).replace("_", "\\_")
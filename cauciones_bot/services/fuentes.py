@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Dict, List, Protocol, Sequence, Tuple
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion
+from cauciones_bot.services.logger import TelegramLogger
+from cauciones_bot.services.metricas import metricas
+from cauciones_bot.services.scraper import ScraperIOLWeb
+
+
+class FuenteCauciones(Protocol):
+    nombre: str
+    moneda: str
+
+    async def obtener_snapshot(self) -> Tuple[List[DatosCaucion], bool]: ...
+
+    async def cerrar(self) -> None: ...
+
+
+class ScraperMultiFuente:
+    """Consulta todas las fuentes en paralelo y une sus tablas en un único snapshot.
+
+    Cada fuente tiene su propio timeout: una caída o lenta solo pierde su
+    porción, que se sigue sirviendo con los últimos datos buenos hasta que
+    superan max_edad_seconds.
+    """
+
+    def __init__(
+        self,
+        fuentes: Sequence[FuenteCauciones],
+        timeout_por_fuente: float = Config.FUENTES_TIMEOUT_SECONDS,
+        max_edad_seconds: float = Config.FUENTES_MAX_EDAD_SECONDS,
+    ) -> None:
+        self._fuentes = list(fuentes)
+        self._timeout = timeout_por_fuente
+        self._max_edad = max_edad_seconds
+        self._porciones: Dict[str, Tuple[List[DatosCaucion], float]] = {}
+
+    async def cerrar(self) -> None:
+        await asyncio.gather(*(fuente.cerrar() for fuente in self._fuentes))
+
+    async def obtener_datos(self) -> List[DatosCaucion]:
+        datos, _ = await self.obtener_snapshot()
+        return datos
+
+    async def obtener_snapshot(self) -> Tuple[List[DatosCaucion], bool]:
+        with metricas.cronometro("scrape_fuentes"):
+            resultados = await asyncio.gather(
+                *(self._consultar(fuente) for fuente in self._fuentes)
+            )
+
+        ahora = time.monotonic()
+        datos: List[DatosCaucion] = []
+        hubo_cambio = False
+        for fuente, (porcion, cambio) in zip(self._fuentes, resultados):
+            if porcion:
+                self._porciones[fuente.nombre] = (porcion, ahora)
+                hubo_cambio |= cambio
+            elif fuente.nombre in self._porciones:
+                porcion, obtenida = self._porciones[fuente.nombre]
+                if ahora - obtenida > self._max_edad:
+                    # Se deja de publicar la porción vencida: eso también es un cambio.
+                    del self._porciones[fuente.nombre]
+                    porcion, hubo_cambio = [], True
+            datos.extend(porcion)
+        return datos, hubo_cambio
+
+    async def _consultar(self, fuente: FuenteCauciones) -> Tuple[List[DatosCaucion], bool]:
+        try:
+            return await asyncio.wait_for(fuente.obtener_snapshot(), timeout=self._timeout)
+        except asyncio.TimeoutError:
+            metricas.incrementar("fuentes_timeouts")
+            return [], True
+
+
+def crear_scraper(logger: TelegramLogger) -> ScraperMultiFuente:
+    fuentes = [
+        ScraperIOLWeb(url, logger, nombre=nombre, moneda=moneda)
+        for nombre, moneda, url in Config.FUENTES
+    ]
+    return ScraperMultiFuente(fuentes)
@@ -1,27 +1,57 @@
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import pytz
 
 from cauciones_bot.config import Config
-from cauciones_bot.models import DatosCaucion, PuntoHistorial
+from cauciones_bot.models import DatosCaucion, VistaHistorial
+from cauciones_bot.services.almacen import AlmacenHistorial
+from cauciones_bot.services.estadisticas import EstadisticasStreaming
+from cauciones_bot.services.rollups import AcumuladorRollups, elegir_resolucion, inicio_bucket
+from cauciones_bot.services.serie import SerieTasas
 
 
 class HistorialService:
-    def __init__(self, max_points: int = Config.MAX_HISTORY_POINTS) -> None:
-        self._historial: List[PuntoHistorial] = []
+    def __init__(
+        self,
+        max_points: int = Config.MAX_HISTORY_POINTS,
+        almacen: Optional[AlmacenHistorial] = None,
+        solo_lectura: bool = False,
+        ruta_colector: Optional[str] = None,
+    ) -> None:
+        # Modo worker: la base del colector se abre en solo lectura y, si todavía
+        # no existe, se reintenta en cada sincronizar().
+        self._ruta_colector = ruta_colector
+        if ruta_colector:
+            almacen = AlmacenHistorial.abrir_solo_lectura(ruta_colector)
+            solo_lectura = True
+        self._almacen = almacen
         self._max_points = max_points
+        self._serie = SerieTasas(max_points)
+        self._version = 0
+        self._al_cambiar: List[Callable[[], None]] = []
+        self._rollups: Optional[AcumuladorRollups] = None
+        self.estadisticas = EstadisticasStreaming()
+        if almacen:
+            recientes = almacen.recientes(max_points)
+            self._serie.cargar(recientes)
+            self.estadisticas.cargar(recientes)
+        if almacen and not solo_lectura:
+            self._rollups = AcumuladorRollups(almacen, self._serie.plazos)
+            extremos = almacen.extremos()
+            if extremos and not almacen.hay_rollups():
+                self._rollups.reconstruir(*extremos)
 
     def agregar_punto(
         self, datos: List[DatosCaucion], timestamp: Optional[datetime] = None
     ) -> None:
         tz_ar = pytz.timezone("America/Argentina/Buenos_Aires")
-        ahora = timestamp or datetime.now(tz_ar)
+        ahora = int((timestamp or datetime.now(tz_ar)).timestamp())
 
-        if self._historial:
-            ultimo = self._historial[-1]
-            if (ahora - ultimo.hora).total_seconds() < Config.HISTORY_MIN_INTERVAL_SECONDS:
-                return
+        ultimo = self._serie.ultimo_ts
+        if ultimo is not None and ahora - ultimo < Config.HISTORY_MIN_INTERVAL_SECONDS:
+            return
 
         mapa_tasas = {}
         for dato in datos:
@@ -31,14 +61,67 @@ class HistorialService:
         if not mapa_tasas:
             return
 
-        punto = PuntoHistorial(hora=ahora, tasas_por_plazo=mapa_tasas)
-        self._historial.append(punto)
+        self._serie.agregar(ahora, mapa_tasas)
+        self.estadisticas.actualizar(ahora, mapa_tasas)
+        if self._almacen:
+            self._almacen.agregar(ahora, mapa_tasas)
+        if self._rollups:
+            self._rollups.agregar(ahora, self._serie.ultima_fila())
+        self._notificar()
+
+    def sincronizar(self) -> None:
+        # Modo worker: el almacén lo escribe el colector; se traen solo los puntos nuevos.
+        if self._almacen is None and self._ruta_colector:
+            self._almacen = AlmacenHistorial.abrir_solo_lectura(self._ruta_colector)
+        if self._almacen is None:
+            return
+        ultimo = self._serie.ultimo_ts
+        if ultimo is None:
+            nuevos = self._almacen.recientes(self._max_points)
+        else:
+            nuevos = self._almacen.rango(ultimo + 1)
+        if len(nuevos):
+            self._serie.cargar(nuevos)
+            self.estadisticas.cargar(nuevos)
+            self._notificar()
+
+    def _notificar(self) -> None:
+        self._version += 1
+        for callback in self._al_cambiar:
+            callback()
 
-        if len(self._historial) > self._max_points:
-            self._historial.pop(0)
+    @property
+    def version(self) -> int:
+        return self._version
 
-    def obtener_historial(self) -> List[PuntoHistorial]:
-        return self._historial.copy()
+    def suscribir_cambios(self, callback: Callable[[], None]) -> None:
+        self._al_cambiar.append(callback)
+
+    def obtener_historial(
+        self, dias: Optional[int] = None, plazo: Optional[int] = None
+    ) -> VistaHistorial:
+        if dias is None:
+            return self._serie.vista()
+
+        desde = int(time.time()) - dias * 86400
+        resolucion = elegir_resolucion(dias)
+        if self._almacen and resolucion != Config.HISTORY_MIN_INTERVAL_SECONDS:
+            return self._almacen.rango_rollup(
+                resolucion, inicio_bucket(desde, resolucion), plazo=plazo
+            )
+
+        vista = self._serie.vista()
+        en_memoria = len(vista) and vista.ts[0] <= desde
+        if self._almacen and not en_memoria:
+            return self._almacen.rango(desde, plazo=plazo)
+        return self._serie.vista(desde=desde)
+
+    def __len__(self) -> int:
+        return len(self._serie)
 
     def tiene_datos_suficientes(self, minimo: int = 2) -> bool:
-        return len(self._historial) >= minimo
+        return len(self._serie) >= minimo
+
+    def cerrar(self) -> None:
+        if self._almacen:
+            self._almacen.cerrar()
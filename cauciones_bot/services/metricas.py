@@ -0,0 +1,178 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from cauciones_bot.config import Config
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class Histograma:
+    __slots__ = ("cuentas", "suma", "total", "maximo")
+
+    def __init__(self) -> None:
+        self.cuentas: List[int] = [0] * (len(BUCKETS_SEGUNDOS) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        self.cuentas[bisect.bisect_left(BUCKETS_SEGUNDOS, valor)] += 1
+        self.suma += valor
+        self.total += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+
+class _Cronometro:
+    __slots__ = ("_histograma", "_inicio")
+
+    def __init__(self, histograma: Histograma) -> None:
+        self._histograma = histograma
+
+    def __enter__(self) -> "_Cronometro":
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histograma.observar(time.perf_counter() - self._inicio)
+
+
+class RegistroMetricas:
+    """Contadores, gauges e histogramas en memoria: registrar cuesta un par de µs."""
+
+    def __init__(self, prefijo: str = "cauciones") -> None:
+        self._prefijo = prefijo
+        self._contadores: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauges_dinamicos: Dict[str, Callable[[], float]] = {}
+        self._histogramas: Dict[str, Histograma] = {}
+
+    def incrementar(self, nombre: str, valor: float = 1.0) -> None:
+        self._contadores[nombre] = self._contadores.get(nombre, 0.0) + valor
+
+    def fijar(self, nombre: str, valor: float) -> None:
+        self._gauges[nombre] = valor
+
+    def registrar_gauge(self, nombre: str, funcion: Callable[[], float]) -> None:
+        # Se evalúa solo al exportar: no suma costo al hot path.
+        self._gauges_dinamicos[nombre] = funcion
+
+    def observar(self, nombre: str, segundos: float) -> None:
+        self._histograma(nombre).observar(segundos)
+
+    def cronometro(self, nombre: str) -> _Cronometro:
+        return _Cronometro(self._histograma(nombre))
+
+    def _histograma(self, nombre: str) -> Histograma:
+        histograma = self._histogramas.get(nombre)
+        if histograma is None:
+            histograma = self._histogramas[nombre] = Histograma()
+        return histograma
+
+    def _valores_gauges(self) -> Dict[str, float]:
+        valores = dict(self._gauges)
+        for nombre, funcion in self._gauges_dinamicos.items():
+            try:
+                valores[nombre] = float(funcion())
+            except Exception as exc:
+                logging.warning("⚠️ Gauge %s falló: %s", nombre, exc)
+        return valores
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "tiempos": {
+                nombre: {
+                    "n": h.total,
+                    "media_ms": h.suma / h.total * 1e3 if h.total else 0.0,
+                    "max_ms": h.maximo * 1e3,
+                }
+                for nombre, h in sorted(self._histogramas.items())
+            },
+            "contadores": dict(sorted(self._contadores.items())),
+            "gauges": dict(sorted(self._valores_gauges().items())),
+        }
+
+    def exportar(self) -> str:
+        lineas: List[str] = []
+        for nombre, valor in sorted(self._contadores.items()):
+            metrica = f"{self._prefijo}_{nombre}_total"
+            lineas += [f"# TYPE {metrica} counter", f"{metrica} {valor:g}"]
+        for nombre, valor in sorted(self._valores_gauges().items()):
+            metrica = f"{self._prefijo}_{nombre}"
+            lineas += [f"# TYPE {metrica} gauge", f"{metrica} {valor:g}"]
+        for nombre, h in sorted(self._histogramas.items()):
+            metrica = f"{self._prefijo}_{nombre}_seconds"
+            lineas.append(f"# TYPE {metrica} histogram")
+            acumulado = 0
+            for limite, cuenta in zip(BUCKETS_SEGUNDOS + ("+Inf",), h.cuentas):
+                acumulado += cuenta
+                lineas.append(f'{metrica}_bucket{{le="{limite}"}} {acumulado}')
+            lineas += [f"{metrica}_sum {h.suma:g}", f"{metrica}_count {h.total}"]
+        return "\n".join(lineas) + "\n"
+
+
+metricas = RegistroMetricas()
+
+
+class ServidorMetricas:
+    """Endpoint HTTP mínimo en formato Prometheus (GET /metrics)."""
+
+    def __init__(
+        self,
+        registro: RegistroMetricas = metricas,
+        host: str = Config.METRICAS_HOST,
+        puerto: int = Config.METRICAS_PUERTO,
+    ) -> None:
+        self._registro = registro
+        self._host = host
+        self._puerto = puerto
+        self._servidor: Optional[asyncio.AbstractServer] = None
+
+    async def iniciar(self) -> None:
+        if not self._puerto:
+            return
+        try:
+            self._servidor = await asyncio.start_server(self._atender, self._host, self._puerto)
+        except OSError as exc:
+            # Colector y workers en el mismo host necesitan METRICAS_PUERTO distintos:
+            # sin endpoint el proceso sigue funcionando igual.
+            logging.warning(
+                "⚠️ Métricas deshabilitadas en %s:%s: %s", self._host, self._puerto, exc
+            )
+            return
+        logging.info("📈 Métricas en http://%s:%s/metrics", self._host, self._puerto)
+
+    async def detener(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            pedido = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            partes = pedido.split(b" ", 2)
+            if len(partes) > 1 and partes[0] == b"GET" and partes[1].startswith(b"/metrics"):
+                estado, cuerpo = "200 OK", self._registro.exportar().encode("utf-8")
+            else:
+                estado, cuerpo = "404 Not Found", b""
+            writer.write(
+                f"HTTP/1.1 {estado}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                "Connection: close\r\n\r\n".encode("ascii")
+                + cuerpo
+            )
+            await writer.drain()
+        except (
+            asyncio.TimeoutError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ConnectionError,
+        ):
+            pass
+        finally:
+            writer.close()
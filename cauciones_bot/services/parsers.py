@@ -0,0 +1,150 @@
+from io import BytesIO, StringIO
+from typing import List, Optional, Protocol
+
+import numpy as np
+
+from cauciones_bot.models import TablaCauciones
+
+COL_TASA, COL_PLAZO = "tasa tomadora", "plazo"
+
+
+class EstructuraTablaError(ValueError):
+    pass
+
+
+class ParserCauciones(Protocol):
+    nombre: str
+
+    def parsear(self, html: str) -> TablaCauciones:
+        ...
+
+
+def _tabla_desde_columnas(
+    plazos: np.ndarray, tasas: np.ndarray, raw_tasas: np.ndarray
+) -> TablaCauciones:
+    validos = np.isfinite(tasas) & np.isfinite(plazos)
+    dias = np.trunc(np.where(validos, plazos, 0)).astype(np.int64)
+    validos &= (tasas >= 0) & (dias >= 0)
+    return TablaCauciones(dias[validos], tasas[validos], raw_tasas[validos])
+
+
+class ParserLxml:
+    nombre = "lxml"
+
+    def parsear(self, html: str) -> TablaCauciones:
+        from lxml import etree
+
+        encabezados_vistos: List[List[str]] = []
+        eventos = etree.iterparse(
+            BytesIO(html.encode("utf-8")),
+            events=("end",),
+            tag="table",
+            html=True,
+            recover=True,
+            encoding="utf-8",
+        )
+        for _, tabla in eventos:
+            filas = tabla.iter("tr")
+            encabezado = self._celdas(next(filas, None))
+            if COL_TASA in encabezado and COL_PLAZO in encabezado:
+                # Tabla encontrada: no se sigue parseando el resto de la página.
+                return self._extraer(
+                    filas, encabezado.index(COL_PLAZO), encabezado.index(COL_TASA)
+                )
+            encabezados_vistos.append(encabezado)
+            tabla.clear()
+
+        raise EstructuraTablaError(
+            f"No se encontró la tabla de cauciones (encabezados: {encabezados_vistos})"
+        )
+
+    @staticmethod
+    def _celdas(fila) -> List[str]:
+        if fila is None:
+            return []
+        return [
+            " ".join("".join(celda.itertext()).split()).lower()
+            for celda in fila
+            if celda.tag in ("td", "th")
+        ]
+
+    def _extraer(self, filas, idx_plazo: int, idx_tasa: int) -> TablaCauciones:
+        ancho = max(idx_plazo, idx_tasa)
+        plazos: List[float] = []
+        tasas: List[float] = []
+        raw_tasas: List[str] = []
+        for fila in filas:
+            celdas = self._celdas(fila)
+            if len(celdas) <= ancho:
+                continue
+            raw_tasa = celdas[idx_tasa]
+            plazo = celdas[idx_plazo].replace("días", "").replace("dias", "").replace("d", "")
+            plazos.append(self._numero(plazo))
+            tasas.append(self._numero(raw_tasa.replace("%", "").replace(".", "").replace(",", ".")))
+            raw_tasas.append(raw_tasa)
+        return _tabla_desde_columnas(
+            np.array(plazos, dtype=np.float64),
+            np.array(tasas, dtype=np.float64),
+            np.array(raw_tasas, dtype=object),
+        )
+
+    @staticmethod
+    def _numero(texto: str) -> float:
+        try:
+            return float(texto.strip())
+        except ValueError:
+            return np.nan
+
+
+class ParserPandas:
+    nombre = "pandas"
+
+    def parsear(self, html: str) -> TablaCauciones:
+        import pandas as pd
+
+        tablas = pd.read_html(StringIO(html))
+        if not tablas:
+            raise EstructuraTablaError("La página no contiene tablas")
+
+        df = tablas[0]
+        df.columns = df.columns.str.lower()
+        return self.parsear_dataframe(df)
+
+    @staticmethod
+    def parsear_dataframe(df) -> TablaCauciones:
+        import pandas as pd
+
+        if COL_TASA not in df.columns or COL_PLAZO not in df.columns:
+            raise EstructuraTablaError(
+                f"Faltan columnas '{COL_PLAZO}'/'{COL_TASA}' (encabezados: {list(df.columns)})"
+            )
+
+        raw_tasas = df[COL_TASA].astype(str)
+        tasas = pd.to_numeric(
+            raw_tasas.str.replace("%", "", regex=False)
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False)
+            .str.strip(),
+            errors="coerce",
+        ).to_numpy(dtype=np.float64)
+        plazos = pd.to_numeric(
+            df[COL_PLAZO]
+            .astype(str)
+            .str.lower()
+            .str.replace(r"d[ií]as|d", "", regex=True)
+            .str.strip(),
+            errors="coerce",
+        ).to_numpy(dtype=np.float64)
+        return _tabla_desde_columnas(plazos, tasas, raw_tasas.to_numpy(dtype=object))
+
+
+PARSERS = {ParserLxml.nombre: ParserLxml, ParserPandas.nombre: ParserPandas}
+
+
+def crear_parser(nombre: Optional[str]) -> Optional[ParserCauciones]:
+    if not nombre:
+        return None
+    try:
+        return PARSERS[nombre]()
+    except KeyError:
+        raise ValueError(f"Parser desconocido: {nombre}") from None
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import time
+from dataclasses import asdict, fields
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import ConfiguracionUsuario
+
+_CAMPOS_CONFIG = frozenset(f.name for f in fields(ConfiguracionUsuario))
+
+
+def _serializar(config: ConfiguracionUsuario) -> str:
+    return json.dumps(asdict(config), sort_keys=True)
+
+
+def _deserializar(texto: str) -> ConfiguracionUsuario:
+    # Los campos que ya no existen se descartan y los nuevos toman su default.
+    valores = {k: v for k, v in json.loads(texto).items() if k in _CAMPOS_CONFIG}
+    return ConfiguracionUsuario(**valores)
+
+
+class PersistenciaSQLite(BasePersistence):
+    """Persistencia por usuario en SQLite: cada flush escribe solo las filas que cambiaron.
+
+    Con `compartida` (varios workers sobre la misma base) la configuración del
+    usuario se relee antes de cada update: la pudo cambiar otro worker.
+    """
+
+    def __init__(
+        self,
+        ruta: str = Config.PERSISTENCE_DB_FILE,
+        update_interval: float = Config.PERSISTENCE_UPDATE_SECONDS,
+        compartida: bool = False,
+    ) -> None:
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usuarios (
+                user_id INTEGER PRIMARY KEY,
+                config TEXT NOT NULL,
+                actualizado INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_actualizado ON usuarios (actualizado)"
+        )
+        self._conn.commit()
+        # Último JSON escrito (o leído) por usuario: si no cambió, no se toca la base.
+        self._escritos: Dict[int, str] = {}
+        self._compartida = compartida
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        user_data: Dict[int, Dict[str, Any]] = {}
+        for user_id, texto in self._conn.execute("SELECT user_id, config FROM usuarios"):
+            user_data[user_id] = {"config": _deserializar(texto)}
+            self._escritos[user_id] = texto
+        return user_data
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        config: Optional[ConfiguracionUsuario] = data.get("config")
+        if config is None:
+            return
+        texto = _serializar(config)
+        if self._escritos.get(user_id) == texto:
+            return
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO usuarios (user_id, config, actualizado) VALUES (?, ?, ?)",
+                (user_id, texto, int(time.time())),
+            )
+        self._escritos[user_id] = texto
+
+    async def drop_user_data(self, user_id: int) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM usuarios WHERE user_id = ?", (user_id,))
+        self._escritos.pop(user_id, None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        if not self._compartida:
+            return
+        fila = self._conn.execute(
+            "SELECT config FROM usuarios WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if fila is None or fila[0] == self._escritos.get(user_id):
+            return
+        user_data["config"] = _deserializar(fila[0])
+        self._escritos[user_id] = fila[0]
+
+    def cambios_desde(self, desde: int) -> Dict[int, ConfiguracionUsuario]:
+        """Configuraciones escritas desde `desde` (epoch s), incluido, por cualquier proceso."""
+        return {
+            user_id: _deserializar(texto)
+            for user_id, texto in self._conn.execute(
+                "SELECT user_id, config FROM usuarios WHERE actualizado >= ?", (desde,)
+            )
+        }
+
+    def importar(self, user_data: Dict[int, Dict[str, Any]]) -> int:
+        filas = [
+            (user_id, _serializar(data["config"]), int(time.time()))
+            for user_id, data in user_data.items()
+            if isinstance(data.get("config"), ConfiguracionUsuario)
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO usuarios (user_id, config, actualizado) VALUES (?, ?, ?)",
+                filas,
+            )
+        self._escritos.update((user_id, texto) for user_id, texto, _ in filas)
+        return len(filas)
+
+    async def flush(self) -> None:
+        self._conn.close()
+
+    # El bot no usa chat_data, bot_data, callback_data ni conversaciones:
+    # store_data los desactiva y estos métodos quedan como no-ops.
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        return {}
+
+    async def update_conversation(
+        self, name: str, key: Tuple[Any, ...], new_state: Optional[object]
+    ) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Hashable, Optional, Set
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import VistaHistorial
+from cauciones_bot.services.cache import CacheGraficos, GraficoCacheado
+from cauciones_bot.services.metricas import metricas
+
+
+class ServicioOcupadoError(RuntimeError):
+    pass
+
+
+def _renderizar_en_worker(grafico: str, *args) -> Optional[bytes]:
+    # matplotlib se importa solo dentro del worker: el proceso del bot nunca lo carga.
+    from cauciones_bot.services.charts import GeneradorGraficos
+
+    return getattr(GeneradorGraficos, grafico)(*args)
+
+
+class ServicioGraficos:
+    def __init__(
+        self,
+        workers: int = Config.RENDER_WORKERS,
+        max_pendientes: int = Config.RENDER_MAX_PENDIENTES,
+        timeout: float = Config.RENDER_TIMEOUT_SECONDS,
+        cache: Optional[CacheGraficos] = None,
+    ) -> None:
+        self._workers = workers
+        self._max_pendientes = max_pendientes
+        self._timeout = timeout
+        self._pendientes = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Renders en curso por pool y pools retirados que esperan a vaciarse.
+        self._en_vuelo: Dict[ProcessPoolExecutor, int] = {}
+        self._retirados: Set[ProcessPoolExecutor] = set()
+        self._cache = cache or CacheGraficos()
+        self._en_curso: Dict[Hashable, "asyncio.Future[Optional[GraficoCacheado]]"] = {}
+
+    @property
+    def pendientes(self) -> int:
+        return self._pendientes
+
+    @property
+    def ocupado(self) -> bool:
+        return self._pendientes >= self._max_pendientes
+
+    def acepta(self, clave: Hashable) -> bool:
+        """Si generar(clave) no va a rechazarse: un render en curso se comparte aunque haya cola."""
+        return clave in self._en_curso or not self.ocupado
+
+    def en_cache(self, clave: Hashable) -> Optional[GraficoCacheado]:
+        return self._cache.get(clave)
+
+    def invalidar(self) -> None:
+        self._cache.invalidar()
+
+    async def generar(
+        self, clave: Hashable, grafico: str, *args
+    ) -> Optional[GraficoCacheado]:
+        # La clave incluye la versión del historial: pedidos idénticos
+        # concurrentes comparten un único render.
+        en_curso = self._en_curso.get(clave)
+        if en_curso is None:
+            en_curso = asyncio.ensure_future(self._renderizar_y_guardar(clave, grafico, *args))
+            self._en_curso[clave] = en_curso
+            en_curso.add_done_callback(lambda _: self._en_curso.pop(clave, None))
+        return await asyncio.shield(en_curso)
+
+    async def _renderizar_y_guardar(
+        self, clave: Hashable, grafico: str, *args
+    ) -> Optional[GraficoCacheado]:
+        png = await self.renderizar(grafico, *args)
+        return self._cache.set(clave, png) if png else None
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: el proceso del bot tiene threads (httpx, job queue) y un
+            # fork podría heredar locks tomados.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def renderizar(self, grafico: str, *args) -> Optional[bytes]:
+        if self.ocupado:
+            raise ServicioOcupadoError(f"{self._pendientes} gráficos en cola")
+
+        # El pool serializa los argumentos más tarde, en su propio thread: si
+        # entretanto entra un punto al historial, una vista sin copiar ya
+        # apuntaría a otras filas.
+        args = tuple(arg.copia() if isinstance(arg, VistaHistorial) else arg for arg in args)
+        self._pendientes += 1
+        pool = self._obtener_pool()
+        self._en_vuelo[pool] = self._en_vuelo.get(pool, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+            futuro = loop.run_in_executor(pool, _renderizar_en_worker, grafico, *args)
+            with metricas.cronometro("render"):
+                return await asyncio.wait_for(futuro, self._timeout)
+        except asyncio.TimeoutError:
+            metricas.incrementar("render_timeouts")
+            logging.error("⌛ Render %s superó %ss.", grafico, self._timeout)
+            self._retirar_pool(pool)
+            return None
+        except BrokenProcessPool:
+            # Un worker murió (OOM, segfault en Agg): este pedido falla y el
+            # próximo usa un pool nuevo.
+            metricas.incrementar("render_pool_caido")
+            logging.error("💥 Pool de render caído durante %s.", grafico)
+            self._retirar_pool(pool)
+            return None
+        finally:
+            self._pendientes -= 1
+            self._en_vuelo[pool] -= 1
+            if not self._en_vuelo[pool]:
+                del self._en_vuelo[pool]
+                if pool in self._retirados:
+                    self._retirados.discard(pool)
+                    self._terminar(pool)
+
+    def _retirar_pool(self, pool: ProcessPoolExecutor) -> None:
+        # Un worker colgado ocupa su slot para siempre: el pool deja de recibir
+        # pedidos y se termina cuando acaban los renders que ya tenía, en vez
+        # de matarlos junto con el colgado.
+        if self._pool is pool:
+            self._pool = None
+        self._retirados.add(pool)
+
+    @staticmethod
+    def _terminar(pool: ProcessPoolExecutor) -> None:
+        procesos = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proceso in procesos:
+            proceso.terminate()
+
+    def cerrar(self) -> None:
+        for pool in self._retirados:
+            self._terminar(pool)
+        self._retirados.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,102 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.services.almacen import AlmacenHistorial
+
+
+def inicio_bucket(ts, resolucion: int):
+    offset = Config.TZ_OFFSET_SECONDS
+    return (ts + offset) // resolucion * resolucion - offset
+
+
+def elegir_resolucion(
+    dias: int, resoluciones: Sequence[int] = Config.ROLLUPS_RESOLUCIONES
+) -> int:
+    # La más gruesa que todavía da GRAFICO_MIN_PUNTOS para la ventana pedida.
+    for resolucion in sorted(resoluciones, reverse=True):
+        if dias * 86400 // resolucion >= Config.GRAFICO_MIN_PUNTOS:
+            return resolucion
+    return Config.HISTORY_MIN_INTERVAL_SECONDS
+
+
+def ohlc_por_bucket(
+    ts: np.ndarray, tasas: np.ndarray, resolucion: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    inicios = inicio_bucket(ts, resolucion)
+    cortes = np.concatenate(([0], np.flatnonzero(np.diff(inicios)) + 1))
+    n = len(ts)
+    validos = ~np.isnan(tasas)
+    filas = np.arange(n)[:, None]
+    cols = np.arange(tasas.shape[1])
+    primera = np.minimum.reduceat(np.where(validos, filas, n), cortes, axis=0)
+    ultima = np.maximum.reduceat(np.where(validos, filas, -1), cortes, axis=0)
+    apertura = np.where(primera < n, tasas[np.minimum(primera, n - 1), cols], np.nan)
+    cierre = np.where(ultima >= 0, tasas[np.maximum(ultima, 0), cols], np.nan)
+    maximo = np.fmax.reduceat(tasas, cortes, axis=0)
+    minimo = np.fmin.reduceat(tasas, cortes, axis=0)
+    return inicios[cortes], apertura, maximo, minimo, cierre
+
+
+class AcumuladorRollups:
+    def __init__(
+        self,
+        almacen: AlmacenHistorial,
+        plazos: np.ndarray,
+        resoluciones: Sequence[int] = Config.ROLLUPS_RESOLUCIONES,
+    ) -> None:
+        self._almacen = almacen
+        self._plazos = plazos
+        self._resoluciones = resoluciones
+        # resolucion -> (inicio, matriz 4 x plazos con apertura/máximo/mínimo/cierre)
+        self._abiertos: Dict[int, Tuple[int, np.ndarray]] = {}
+
+    def agregar(self, ts: int, fila: np.ndarray) -> None:
+        for resolucion in self._resoluciones:
+            inicio = inicio_bucket(ts, resolucion)
+            apertura, maximo, minimo, cierre = self._bucket_abierto(resolucion, inicio)
+            apertura[:] = np.where(np.isnan(apertura), fila, apertura)
+            np.fmax(maximo, fila, out=maximo)
+            np.fmin(minimo, fila, out=minimo)
+            cierre[:] = np.where(np.isnan(fila), cierre, fila)
+            # El bucket en curso se persiste en cada punto: los gráficos lo ven
+            # completo y un reinicio no pierde la parte ya acumulada.
+            self._almacen.guardar_rollups(
+                resolucion,
+                np.array([inicio]),
+                self._plazos,
+                apertura[None],
+                maximo[None],
+                minimo[None],
+                cierre[None],
+            )
+
+    def reconstruir(self, desde: int, hasta: int) -> None:
+        bloque = Config.ROLLUPS_BLOQUE_DIAS * 86400
+        inicio = inicio_bucket(desde, 86400)
+        while inicio <= hasta:
+            vista = self._almacen.rango(inicio, inicio + bloque - 1)
+            if len(vista):
+                for resolucion in self._resoluciones:
+                    inicios, apertura, maximo, minimo, cierre = ohlc_por_bucket(
+                        vista.ts, vista.tasas, resolucion
+                    )
+                    self._almacen.guardar_rollups(
+                        resolucion, inicios, vista.plazos, apertura, maximo, minimo, cierre
+                    )
+            inicio += bloque
+        self._abiertos.clear()
+
+    def _bucket_abierto(self, resolucion: int, inicio: int) -> np.ndarray:
+        actual = self._abiertos.get(resolucion)
+        if actual is not None and actual[0] == inicio:
+            return actual[1]
+
+        bucket = np.full((4, len(self._plazos)), np.nan)
+        for plazo, *valores in self._almacen.bucket_rollup(resolucion, inicio):
+            idx = np.searchsorted(self._plazos, plazo)
+            if idx < len(self._plazos) and self._plazos[idx] == plazo:
+                bucket[:, idx] = valores
+        self._abiertos[resolucion] = (inicio, bucket)
+        return bucket
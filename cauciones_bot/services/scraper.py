@@ -1,57 +1,123 @@
-from io import StringIO
-from typing import List
+import asyncio
+import hashlib
+from typing import Dict, List, Optional, Tuple
 
-import pandas as pd
-import requests
+import httpx
 
-from cauciones_bot.models import DatosCaucion
+from cauciones_bot.config import Config
+from cauciones_bot.models import DatosCaucion, TablaCauciones
 from cauciones_bot.services.logger import TelegramLogger
+from cauciones_bot.services.metricas import metricas
+from cauciones_bot.services.parsers import EstructuraTablaError, ParserCauciones, crear_parser
 
 
 class ScraperIOLWeb:
-    def __init__(self, url: str, logger: TelegramLogger) -> None:
+    _HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+    def __init__(
+        self,
+        url: str,
+        logger: TelegramLogger,
+        nombre: str = "iol",
+        moneda: str = Config.MONEDA_PRINCIPAL,
+        timeout: float = Config.SCRAPER_TIMEOUT_SECONDS,
+        max_concurrencia: int = Config.SCRAPER_MAX_CONCURRENCIA,
+        parser: Optional[ParserCauciones] = None,
+        parser_respaldo: Optional[ParserCauciones] = None,
+    ) -> None:
         self._url = url
         self._logger = logger
+        self.nombre = nombre
+        self.moneda = moneda
+        self._parser = parser or crear_parser(Config.SCRAPER_PARSER)
+        self._respaldo = parser_respaldo or crear_parser(Config.SCRAPER_PARSER_RESPALDO)
+        self._timeout = timeout
+        self._semaforo = asyncio.Semaphore(max_concurrencia)
+        self._limites = httpx.Limits(
+            max_connections=max_concurrencia,
+            max_keepalive_connections=max_concurrencia,
+            keepalive_expiry=Config.SCRAPER_KEEPALIVE_SECONDS,
+        )
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self._validadores: Dict[str, str] = {}
+        self._hash_tabla: Optional[bytes] = None
+        self._ultimos_datos: List[DatosCaucion] = []
+
+    def _obtener_cliente(self) -> httpx.AsyncClient:
+        if self._cliente is None or self._cliente.is_closed:
+            self._cliente = httpx.AsyncClient(
+                headers=self._HEADERS,
+                timeout=self._timeout,
+                limits=self._limites,
+                follow_redirects=True,
+            )
+        return self._cliente
+
+    async def cerrar(self) -> None:
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
 
-    def obtener_datos(self) -> List[DatosCaucion]:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        try:
-            response = requests.get(self._url, headers=headers, timeout=10)
-            response.raise_for_status()
-            html_data = StringIO(response.text)
-            tablas = pd.read_html(html_data)
-            if not tablas:
-                return []
-
-            df = tablas[0]
-            df.columns = df.columns.str.lower()
-            return self._parsear_dataframe(df)
-        except Exception as exc:
-            self._logger.error(f"Error scraping IOL: {exc}")
-            return []
-
-    def _parsear_dataframe(self, df: pd.DataFrame) -> List[DatosCaucion]:
-        col_tasa, col_plazo = "tasa tomadora", "plazo"
-        if col_tasa not in df.columns or col_plazo not in df.columns:
-            return []
-
-        resultados: List[DatosCaucion] = []
-        for _, row in df.iterrows():
+    async def obtener_datos(self) -> List[DatosCaucion]:
+        datos, _ = await self.obtener_snapshot()
+        return datos
+
+    async def obtener_snapshot(self) -> Tuple[List[DatosCaucion], bool]:
+        with metricas.cronometro("scrape"):
             try:
-                raw_tasa = str(row[col_tasa])
-                tasa = float(
-                    raw_tasa.replace("%", "").replace(".", "").replace(",", ".").strip()
-                )
-                raw_plazo = (
-                    str(row[col_plazo])
-                    .lower()
-                    .replace("días", "")
-                    .replace("dias", "")
-                    .replace("d", "")
-                    .strip()
+                headers = self._validadores if self._ultimos_datos else {}
+                async with self._semaforo:
+                    response = await self._obtener_cliente().get(self._url, headers=headers)
+                    if response.status_code == 304:
+                        metricas.incrementar("scrape_sin_cambios")
+                        return self._ultimos_datos, False
+                    response.raise_for_status()
+                self._guardar_validadores(response)
+
+                html = response.text
+                hash_tabla = self._hash_tabla_html(html)
+                if hash_tabla == self._hash_tabla and self._ultimos_datos:
+                    metricas.incrementar("scrape_sin_cambios")
+                    return self._ultimos_datos, False
+
+                # El parseo es CPU-bound: se ejecuta fuera del event loop.
+                tabla = await asyncio.to_thread(self._parsear_html, html)
+                datos = tabla.a_datos(self.nombre, self.moneda)
+                if datos:
+                    self._hash_tabla = hash_tabla
+                    self._ultimos_datos = datos
+                return datos, True
+            except Exception as exc:
+                metricas.incrementar("scrape_errores")
+                self._logger.error(f"Error scraping {self.nombre}: {exc}")
+                return [], True
+
+    def _guardar_validadores(self, response: httpx.Response) -> None:
+        self._validadores = {}
+        if "etag" in response.headers:
+            self._validadores["If-None-Match"] = response.headers["etag"]
+        if "last-modified" in response.headers:
+            self._validadores["If-Modified-Since"] = response.headers["last-modified"]
+
+    @staticmethod
+    def _hash_tabla_html(html: str) -> bytes:
+        # Solo la tabla de cauciones: el resto de la página (índices, relojes,
+        # banners) cambia aunque las tasas no.
+        pos = html.lower().find("tasa tomadora")
+        inicio = html.rfind("<table", 0, pos) if pos >= 0 else -1
+        fin = html.find("</table>", pos) if pos >= 0 else -1
+        fragmento = html[inicio:fin] if inicio >= 0 and fin >= 0 else html
+        return hashlib.blake2b(fragmento.encode("utf-8"), digest_size=16).digest()
+
+    def _parsear_html(self, html: str) -> TablaCauciones:
+        with metricas.cronometro("parse"):
+            try:
+                return self._parser.parsear(html)
+            except EstructuraTablaError as exc:
+                if self._respaldo is None:
+                    raise
+                metricas.incrementar("parse_respaldo")
+                self._logger.warning(
+                    f"Parser {self._parser.nombre} falló ({exc}); usando {self._respaldo.nombre}."
                 )
-                dias = int(float(raw_plazo))
-                resultados.append(DatosCaucion(dias=dias, tasa=tasa, raw_tasa=raw_tasa))
-            except Exception:
-                continue
-        return resultados
+                return self._respaldo.parsear(html)
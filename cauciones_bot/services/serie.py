@@ -0,0 +1,114 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.models import VistaHistorial
+
+# ULTIMO: tasa del plazo más largo cotizado en el tramo para ese punto.
+AGG_MAX, AGG_MIN, AGG_MEDIA, AGG_ULTIMO = range(4)
+N_AGREGADOS = 4
+
+
+def mascaras_tramos(
+    plazos: np.ndarray, tramos: Sequence[Tuple[str, int, Optional[int]]] = Config.TRAMOS_PLAZO
+) -> np.ndarray:
+    mascaras = np.zeros((len(tramos), len(plazos)), dtype=bool)
+    for i, (_, minimo, maximo) in enumerate(tramos):
+        mascaras[i] = plazos >= minimo
+        if maximo is not None:
+            mascaras[i] &= plazos <= maximo
+    return mascaras
+
+
+def calcular_agregados(tasas: np.ndarray, mascaras: np.ndarray) -> np.ndarray:
+    agregados = np.full(tasas.shape[:-1] + (len(mascaras), N_AGREGADOS), np.nan)
+    for i, mascara in enumerate(mascaras):
+        if not mascara.any():
+            continue
+        tramo = tasas[..., mascara]
+        cantidad = np.count_nonzero(~np.isnan(tramo), axis=-1)
+        # fmax/fmin ignoran NaN y dejan NaN (hueco en el gráfico) si no hay plazos.
+        agregados[..., i, AGG_MAX] = np.fmax.reduce(tramo, axis=-1)
+        agregados[..., i, AGG_MIN] = np.fmin.reduce(tramo, axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            agregados[..., i, AGG_MEDIA] = np.nansum(tramo, axis=-1) / cantidad
+        # Primer válido recorriendo el tramo al revés; sin válidos queda NaN.
+        desde_el_final = np.argmax(~np.isnan(tramo[..., ::-1]), axis=-1)
+        ultimo = np.take_along_axis(
+            tramo, (tramo.shape[-1] - 1 - desde_el_final)[..., None], axis=-1
+        )[..., 0]
+        agregados[..., i, AGG_ULTIMO] = np.where(cantidad > 0, ultimo, np.nan)
+    return agregados
+
+
+class SerieTasas:
+    def __init__(self, capacidad: int, max_plazo: int = Config.HISTORY_MAX_PLAZO) -> None:
+        self._capacidad = capacidad
+        self._plazos = np.arange(max_plazo + 1, dtype=np.int64)
+        self._plazos.flags.writeable = False
+        # Buffer del doble de la capacidad: la ventana viva siempre es contigua
+        # (vistas sin copia) y se compacta al llegar al final, O(1) amortizado.
+        self._ts = np.zeros(2 * capacidad, dtype=np.int64)
+        self._tasas = np.full((2 * capacidad, max_plazo + 1), np.nan)
+        self._mascaras = mascaras_tramos(self._plazos)
+        self._agregados = np.full((2 * capacidad, len(self._mascaras), N_AGREGADOS), np.nan)
+        self._inicio = 0
+        self._fin = 0
+
+    def __len__(self) -> int:
+        return self._fin - self._inicio
+
+    @property
+    def plazos(self) -> np.ndarray:
+        return self._plazos
+
+    def ultima_fila(self) -> np.ndarray:
+        return self._tasas[self._fin - 1]
+
+    @property
+    def ultimo_ts(self) -> Optional[int]:
+        return int(self._ts[self._fin - 1]) if len(self) else None
+
+    def agregar(self, ts: int, tasas_por_plazo: Dict[int, float]) -> None:
+        fila = self._siguiente_fila(ts)
+        for plazo, tasa in tasas_por_plazo.items():
+            if 0 <= plazo < len(self._plazos):
+                self._tasas[fila, plazo] = tasa
+        self._agregados[fila] = calcular_agregados(self._tasas[fila], self._mascaras)
+
+    def cargar(self, vista: VistaHistorial) -> None:
+        validos = (vista.plazos >= 0) & (vista.plazos < len(self._plazos))
+        plazos = vista.plazos[validos]
+        for ts, tasas in zip(vista.ts[-self._capacidad :], vista.tasas[-self._capacidad :]):
+            fila = self._siguiente_fila(int(ts))
+            self._tasas[fila, plazos] = tasas[validos]
+            self._agregados[fila] = calcular_agregados(self._tasas[fila], self._mascaras)
+
+    def vista(self, desde: Optional[int] = None, hasta: Optional[int] = None) -> VistaHistorial:
+        # Las vistas son de solo lectura y válidas hasta el próximo agregar().
+        ts = self._ts[self._inicio : self._fin]
+        i = int(np.searchsorted(ts, desde, side="left")) if desde is not None else 0
+        j = int(np.searchsorted(ts, hasta, side="right")) if hasta is not None else len(ts)
+        ts_vista = ts[i:j]
+        tasas_vista = self._tasas[self._inicio + i : self._inicio + j]
+        agregados_vista = self._agregados[self._inicio + i : self._inicio + j]
+        for arreglo in (ts_vista, tasas_vista, agregados_vista):
+            arreglo.flags.writeable = False
+        return VistaHistorial(ts_vista, self._plazos, tasas_vista, agregados_vista)
+
+    def _siguiente_fila(self, ts: int) -> int:
+        if self._fin == len(self._ts):
+            n = self._capacidad - 1
+            self._ts[:n] = self._ts[self._fin - n : self._fin]
+            self._tasas[:n] = self._tasas[self._fin - n : self._fin]
+            self._agregados[:n] = self._agregados[self._fin - n : self._fin]
+            self._inicio, self._fin = 0, n
+
+        fila = self._fin
+        self._ts[fila] = ts
+        self._tasas[fila] = np.nan
+        self._fin += 1
+        if self._fin - self._inicio > self._capacidad:
+            self._inicio += 1
+        return fila
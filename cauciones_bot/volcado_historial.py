@@ -0,0 +1,60 @@
+"""Exporta o importa el historial de tasas en Arrow IPC (.arrow) o Parquet (.parquet).
+
+Importar reconstruye los rollups del rango importado. Los puntos más viejos que
+HISTORY_RETENTION_DAYS se purgan de la tabla cruda, pero sus rollups quedan.
+Conviene importar con el bot detenido: el historial en memoria se carga al arrancar.
+
+Uso: python -m cauciones_bot.volcado_historial exportar historial.arrow
+                                               [--desde 2024-01-01] [--hasta 2024-03-31]
+     python -m cauciones_bot.volcado_historial importar historial.parquet
+"""
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from cauciones_bot.config import Config
+from cauciones_bot.services import columnar
+from cauciones_bot.services.almacen import AlmacenHistorial
+from cauciones_bot.services.rollups import AcumuladorRollups
+
+
+def _ts_dia(fecha: str) -> int:
+    # Medianoche ART, igual que los buckets diarios.
+    medianoche_utc = datetime.strptime(fecha, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(medianoche_utc.timestamp()) - Config.TZ_OFFSET_SECONDS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default=Config.HISTORY_DB_FILE)
+    parser.add_argument("--lote", type=int, default=Config.VOLCADO_LOTE_FILAS)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    exportar = comandos.add_parser("exportar")
+    exportar.add_argument("destino")
+    exportar.add_argument("--desde", help="YYYY-MM-DD")
+    exportar.add_argument("--hasta", help="YYYY-MM-DD (inclusive)")
+    importar = comandos.add_parser("importar")
+    importar.add_argument("origen")
+    args = parser.parse_args()
+
+    almacen = AlmacenHistorial(args.base)
+    try:
+        if args.comando == "exportar":
+            desde = _ts_dia(args.desde) if args.desde else 0
+            hasta = _ts_dia(args.hasta) + 86399 if args.hasta else None
+            filas = columnar.exportar(almacen, args.destino, desde, hasta, args.lote)
+            print(f"✅ {filas} filas exportadas a {args.destino}.")
+            return
+
+        filas, rango = columnar.importar(almacen, args.origen, args.lote)
+        if rango is not None:
+            plazos = np.arange(Config.HISTORY_MAX_PLAZO + 1, dtype=np.int64)
+            AcumuladorRollups(almacen, plazos).reconstruir(*rango)
+        print(f"✅ {filas} filas importadas de {args.origen}.")
+    finally:
+        almacen.cerrar()
+
+
+if __name__ == "__main__":
+    main()